@@ -10,8 +10,11 @@ Date: 2025-11-05
 import pyedflib
 import numpy as np
 import matplotlib.pyplot as plt
+from scipy.fft import set_workers
+from scipy.signal import welch
 from pathlib import Path
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
 import sys
 
 # EMG channel names (based on EDF analysis)
@@ -21,9 +24,23 @@ EMG_CHANNELS = {
     'LLEG': 'EMG LLEG+'
 }
 
+# Contiguous [low, high) frequency bands for the power distribution
+BAND_NAMES = [
+    '0-10 Hz (DC/motion)',
+    '10-20 Hz (low EMG)',
+    '20-100 Hz (main EMG)',
+    '100-128 Hz (high EMG)'
+]
+BAND_EDGES = np.array([0, 10, 20, 100, 128])
+
+# Welch segment length, and number of segments read per streamed block
+# (4 s x 1024 is about 1M samples at 256 Hz)
+SEGMENT_SECONDS = 4
+BLOCK_SEGMENTS = 1024
+
 
 def extract_edf_specs(edf_path):
-    """Extract technical specifications from EDF file."""
+    """Extract technical specifications and frequency content from EDF file."""
     print(f"\n{'='*70}")
     print(f"Analyzing: {Path(edf_path).name}")
     print(f"{'='*70}\n")
@@ -37,91 +54,185 @@ def extract_edf_specs(edf_path):
         'channels': {}
     }
 
-    # Find EMG channel indices
-    channel_labels = [f.getLabel(i) for i in range(f.signals_in_file)]
+    # Find EMG channel indices (first channel wins for duplicate labels)
+    label_to_idx = {}
+    for i in range(f.signals_in_file):
+        label_to_idx.setdefault(f.getLabel(i), i)
+    n_samples = f.getNSamples()
 
     for emg_name, emg_label in EMG_CHANNELS.items():
-        try:
-            ch_idx = channel_labels.index(emg_label)
-
-            specs['channels'][emg_name] = {
-                'index': ch_idx,
-                'label': f.getLabel(ch_idx),
-                'sample_freq': f.getSampleFrequency(ch_idx),
-                'physical_dim': f.getPhysicalDimension(ch_idx),
-                'physical_min': f.getPhysicalMinimum(ch_idx),
-                'physical_max': f.getPhysicalMaximum(ch_idx),
-                'digital_min': f.getDigitalMinimum(ch_idx),
-                'digital_max': f.getDigitalMaximum(ch_idx),
-                'prefilter': f.getPrefilter(ch_idx),
-                'transducer': f.getTransducer(ch_idx)
-            }
-
-            # Read signal data
-            signal = f.readSignal(ch_idx)
-            specs['channels'][emg_name]['signal'] = signal
-
-            # Calculate statistics
-            specs['channels'][emg_name]['stats'] = {
-                'mean': np.mean(signal),
-                'std': np.std(signal),
-                'rms': np.sqrt(np.mean(signal**2)),
-                'min': np.min(signal),
-                'max': np.max(signal),
-                'range': np.max(signal) - np.min(signal)
-            }
-
-        except ValueError:
+        ch_idx = label_to_idx.get(emg_label)
+        if ch_idx is None:
             print(f"Warning: Channel {emg_label} not found in {specs['file']}")
             specs['channels'][emg_name] = None
+            continue
+
+        specs['channels'][emg_name] = {
+            'index': ch_idx,
+            'label': f.getLabel(ch_idx),
+            'sample_freq': f.getSampleFrequency(ch_idx),
+            'n_samples': int(n_samples[ch_idx]),
+            'physical_dim': f.getPhysicalDimension(ch_idx),
+            'physical_min': f.getPhysicalMinimum(ch_idx),
+            'physical_max': f.getPhysicalMaximum(ch_idx),
+            'digital_min': f.getDigitalMinimum(ch_idx),
+            'digital_max': f.getDigitalMaximum(ch_idx),
+            'prefilter': f.getPrefilter(ch_idx),
+            'transducer': f.getTransducer(ch_idx)
+        }
+
+    freq_analysis = analyze_channel_blocks(f, specs)
 
     f.close()
-    return specs
+    return specs, freq_analysis
+
+
+def read_signal_block(f, ch_data, start, n):
+    """Read n samples of a channel as float32 physical values."""
+    # The EDF stores 16-bit samples, so read them digitally and scale to
+    # float32 in place rather than letting pyedflib build a float64 copy
+    gain = ((ch_data['physical_max'] - ch_data['physical_min']) /
+            (ch_data['digital_max'] - ch_data['digital_min']))
+    offset = ch_data['physical_min'] - ch_data['digital_min'] * gain
+    block = f.readSignal(ch_data['index'], start=start, n=n, digital=True).astype(np.float32)
+    block *= gain
+    block += offset
+    return block
+
+
+def analyze_channel_blocks(f, specs):
+    """
+    Stream the EMG channels block by block, filling in each channel's
+    statistics and 30 s plot window and returning its frequency analysis.
+
+    Only one block per channel is held in memory regardless of recording
+    length. Blocks are a whole number of non-overlapping Welch segments, so
+    the segment-weighted mean of the block PSDs equals the PSD of the whole
+    recording.
+    """
+    # Group channels sharing sampling rate and length so each group is
+    # analyzed with one batched (2D) spectral estimate per block
+    groups = {}
+    for ch_name in ['CHIN', 'RLEG', 'LLEG']:
+        ch_data = specs['channels'][ch_name]
+        if ch_data is not None:
+            key = (ch_data['sample_freq'], ch_data['n_samples'])
+            groups.setdefault(key, []).append(ch_name)
+
+    freq_analysis = {}
+    for (fs, n_total), ch_names in groups.items():
+        n_ch = len(ch_names)
+        nperseg = int(SEGMENT_SECONDS * fs)
+        block_size = nperseg * BLOCK_SEGMENTS
+
+        total = np.zeros(n_ch)
+        total_sq = np.zeros(n_ch)
+        sig_min = np.full(n_ch, np.inf)
+        sig_max = np.full(n_ch, -np.inf)
+        psd_sum = None
+        n_segments = 0
+
+        for start in range(0, n_total, block_size):
+            n = min(block_size, n_total - start)
+            blocks = np.stack([read_signal_block(f, specs['channels'][ch_name], start, n)
+                               for ch_name in ch_names])
+
+            if start == 0:
+                plot_samples = min(int(30 * fs), n)
+                for ch_name, block in zip(ch_names, blocks):
+                    specs['channels'][ch_name]['plot_signal'] = block[:plot_samples].copy()
+                    specs['channels'][ch_name]['plot_time'] = (
+                        np.arange(plot_samples, dtype=np.float32) / fs)
+
+            # Accumulate statistics in float64 to keep float32 input precise
+            total += blocks.sum(axis=1, dtype=np.float64)
+            total_sq += np.einsum('ij,ij->i', blocks, blocks, dtype=np.float64)
+            sig_min = np.minimum(sig_min, blocks.min(axis=1))
+            sig_max = np.maximum(sig_max, blocks.max(axis=1))
+
+            block_segments = n // nperseg
+            if block_segments > 0:
+                psd_freq, psd = welch_psd(blocks, fs)
+                psd_sum = psd * block_segments if psd_sum is None else psd_sum + psd * block_segments
+                n_segments += block_segments
+
+        for i, ch_name in enumerate(ch_names):
+            # std and RMS both derive from the mean square
+            mean = total[i] / n_total
+            mean_square = total_sq[i] / n_total
+            specs['channels'][ch_name]['stats'] = {
+                'mean': mean,
+                'std': np.sqrt(max(mean_square - mean * mean, 0.0)),
+                'rms': np.sqrt(mean_square),
+                'min': sig_min[i],
+                'max': sig_max[i],
+                'range': sig_max[i] - sig_min[i]
+            }
+            if n_segments > 0:
+                freq_analysis[ch_name] = summarize_spectrum(psd_freq, psd_sum[i] / n_segments)
 
+    return freq_analysis
 
-def analyze_frequency_content(signal, fs, channel_name):
-    """Analyze frequency content using FFT."""
-    # Compute FFT
-    fft = np.fft.fft(signal)
-    fft_freq = np.fft.fftfreq(len(signal), 1/fs)
 
+def summarize_spectrum(psd_freq, psd):
+    """Summarize a one-sided PSD into band percentages and peak frequency."""
     # Only keep positive frequencies
-    positive_freq_idx = fft_freq > 0
-    fft_freq = fft_freq[positive_freq_idx]
-    fft_mag = np.abs(fft[positive_freq_idx])
-
-    # Calculate power in different frequency bands
-    def band_power(freqs, magnitudes, low, high):
-        band_idx = (freqs >= low) & (freqs < high)
-        return np.sum(magnitudes[band_idx]**2)
-
-    total_power = np.sum(fft_mag**2)
-
-    bands = {
-        '0-10 Hz (DC/motion)': band_power(fft_freq, fft_mag, 0, 10),
-        '10-20 Hz (low EMG)': band_power(fft_freq, fft_mag, 10, 20),
-        '20-100 Hz (main EMG)': band_power(fft_freq, fft_mag, 20, 100),
-        '100-128 Hz (high EMG)': band_power(fft_freq, fft_mag, 100, 128)
-    }
+    psd_freq = psd_freq[1:]
+    psd = psd[1:]
+
+    # Calculate power in different frequency bands. psd_freq is sorted, so
+    # the band edges map to indices by binary search and every band sum (and
+    # the total) falls out of a single cumulative sum.
+    edge_idx = np.searchsorted(psd_freq, BAND_EDGES)
+    cumulative = np.concatenate(([0.0], np.cumsum(psd, dtype=np.float64)))
+
+    total_power = cumulative[-1]
+
+    band_sums = cumulative[edge_idx[1:]] - cumulative[edge_idx[:-1]]
+    bands = dict(zip(BAND_NAMES, band_sums))
 
     # Convert to percentages
     band_percentages = {k: (v/total_power)*100 for k, v in bands.items()}
 
     # Find peak frequency
-    peak_idx = np.argmax(fft_mag)
-    peak_freq = fft_freq[peak_idx]
+    peak_idx = np.argmax(psd)
+    peak_freq = psd_freq[peak_idx]
 
     return {
-        'fft_freq': fft_freq,
-        'fft_mag': fft_mag,
+        'psd_freq': psd_freq,
+        'psd': psd,
         'band_percentages': band_percentages,
         'peak_freq': peak_freq
     }
 
 
-def create_analysis_plot(specs, freq_analysis, output_path):
-    """Create comprehensive analysis plot."""
-    fig = plt.figure(figsize=(16, 12))
+def welch_psd(signals, fs):
+    """Welch PSD of equally sampled signals (one per row)."""
+    # Welch PSD over 4 s Hann segments: many small FFTs instead of one FFT
+    # over the whole multi-hour recording. Segments do not overlap - a night
+    # yields thousands of them, so overlap would double the FFT work without
+    # visibly lowering the variance of four band percentages. All rows are
+    # transformed in a single call along the last axis, in float32 and with
+    # scipy.fft using all cores for the segment FFTs.
+    signals = signals.astype(np.float32, copy=False)
+    nperseg = int(SEGMENT_SECONDS * fs)
+    with set_workers(-1):
+        return welch(signals, fs=fs, window='hann', nperseg=nperseg,
+                     noverlap=0, scaling='density', axis=-1)
+
+
+def create_analysis_plot(specs, freq_analysis, output_path, fig=None):
+    """
+    Create comprehensive analysis plot.
+
+    Pass a Figure as fig to reuse it across files (it is cleared first and
+    left open); otherwise a new figure is created and closed.
+    """
+    own_figure = fig is None
+    if own_figure:
+        fig = plt.figure(figsize=(16, 12))
+    else:
+        fig.clear()
 
     channels = ['CHIN', 'RLEG', 'LLEG']
     colors = {'CHIN': 'blue', 'RLEG': 'red', 'LLEG': 'green'}
@@ -131,55 +242,63 @@ def create_analysis_plot(specs, freq_analysis, output_path):
             continue
 
         ch_data = specs['channels'][ch_name]
-        signal = ch_data['signal']
         fs = ch_data['sample_freq']
 
         # Row 1: Time domain (first 30 seconds)
-        ax1 = plt.subplot(4, 3, idx + 1)
-        time_samples = int(30 * fs)  # 30 seconds
-        time_axis = np.arange(time_samples) / fs
-        ax1.plot(time_axis, signal[:time_samples], color=colors[ch_name], linewidth=0.5)
+        ax1 = fig.add_subplot(4, 3, idx + 1)
+        ax1.plot(ch_data['plot_time'], ch_data['plot_signal'], color=colors[ch_name], linewidth=0.5)
         ax1.set_title(f'{ch_name} - First 30s (Wake Period)', fontweight='bold')
         ax1.set_xlabel('Time (s)')
         ax1.set_ylabel(f'Amplitude ({ch_data["physical_dim"]})')
         ax1.grid(True, alpha=0.3)
 
         # Row 2: Frequency spectrum
-        ax2 = plt.subplot(4, 3, idx + 4)
-        freq_data = freq_analysis[ch_name]
-        ax2.semilogy(freq_data['fft_freq'][:1000], freq_data['fft_mag'][:1000],
-                     color=colors[ch_name], linewidth=0.5)
-        ax2.axvline(60, color='red', linestyle='--', alpha=0.5, label='60 Hz')
-        ax2.set_title(f'{ch_name} - Frequency Spectrum', fontweight='bold')
-        ax2.set_xlabel('Frequency (Hz)')
-        ax2.set_ylabel('Magnitude (log scale)')
-        ax2.set_xlim([0, 128])
-        ax2.grid(True, alpha=0.3)
-        ax2.legend()
-
-        # Row 3: Frequency band distribution
-        ax3 = plt.subplot(4, 3, idx + 7)
-        bands = freq_data['band_percentages']
-        band_names = list(bands.keys())
-        band_values = list(bands.values())
-        bars = ax3.bar(range(len(bands)), band_values, color=colors[ch_name], alpha=0.7)
-        ax3.set_title(f'{ch_name} - Frequency Band Distribution', fontweight='bold')
-        ax3.set_ylabel('Power (%)')
-        ax3.set_xticks(range(len(bands)))
-        ax3.set_xticklabels([b.split()[0] for b in band_names], rotation=45, ha='right')
-        ax3.grid(True, alpha=0.3, axis='y')
-
-        # Add percentage labels on bars
-        for bar, val in zip(bars, band_values):
-            height = bar.get_height()
-            ax3.text(bar.get_x() + bar.get_width()/2., height,
-                    f'{val:.1f}%', ha='center', va='bottom', fontsize=8)
+        ax2 = fig.add_subplot(4, 3, idx + 4)
+        ax3 = fig.add_subplot(4, 3, idx + 7)
+        freq_data = freq_analysis.get(ch_name)
+        if freq_data is None:
+            # Channel shorter than one Welch segment: no spectrum to plot
+            for ax in (ax2, ax3):
+                ax.axis('off')
+                ax.text(0.5, 0.5, f'{ch_name}: shorter than one {SEGMENT_SECONDS} s segment\n'
+                        'no frequency analysis', transform=ax.transAxes,
+                        ha='center', va='center', fontsize=9)
+        else:
+            # The Welch PSD has 2*fs bins spanning 0 to fs/2, so the whole
+            # spectrum is plotted rather than a fixed-length prefix
+            ax2.semilogy(freq_data['psd_freq'], freq_data['psd'],
+                         color=colors[ch_name], linewidth=0.5)
+            ax2.axvline(60, color='red', linestyle='--', alpha=0.5, label='60 Hz')
+            ax2.set_title(f'{ch_name} - Frequency Spectrum', fontweight='bold')
+            ax2.set_xlabel('Frequency (Hz)')
+            ax2.set_ylabel('PSD (log scale)')
+            ax2.set_xlim([0, 128])
+            ax2.grid(True, alpha=0.3)
+            ax2.legend()
+
+            # Row 3: Frequency band distribution
+            bands = freq_data['band_percentages']
+            band_names = list(bands.keys())
+            band_values = list(bands.values())
+            bars = ax3.bar(range(len(bands)), band_values, color=colors[ch_name], alpha=0.7)
+            ax3.set_title(f'{ch_name} - Frequency Band Distribution', fontweight='bold')
+            ax3.set_ylabel('Power (%)')
+            ax3.set_xticks(range(len(bands)))
+            ax3.set_xticklabels([b.split()[0] for b in band_names], rotation=45, ha='right')
+            ax3.grid(True, alpha=0.3, axis='y')
+
+            # Add percentage labels on bars
+            for bar, val in zip(bars, band_values):
+                height = bar.get_height()
+                ax3.text(bar.get_x() + bar.get_width()/2., height,
+                        f'{val:.1f}%', ha='center', va='bottom', fontsize=8)
 
         # Row 4: Statistics table
-        ax4 = plt.subplot(4, 3, idx + 10)
+        ax4 = fig.add_subplot(4, 3, idx + 10)
         ax4.axis('off')
 
         stats = ch_data['stats']
+        peak_freq = f"{freq_data['peak_freq']:.1f} Hz" if freq_data is not None else 'n/a'
         stats_text = f"""
         Statistics for {ch_name} EMG:
 
@@ -191,75 +310,102 @@ def create_analysis_plot(specs, freq_analysis, output_path):
         Range:       {stats['range']:>10.2f} {ch_data['physical_dim']}
 
         Sampling:    {fs} Hz
-        Peak Freq:   {freq_data['peak_freq']:.1f} Hz
+        Peak Freq:   {peak_freq}
         """
 
         ax4.text(0.1, 0.5, stats_text, transform=ax4.transAxes,
                 fontfamily='monospace', fontsize=9, verticalalignment='center')
 
-    plt.suptitle(f'EMG Signal Analysis: {specs["file"]}',
+    fig.suptitle(f'EMG Signal Analysis: {specs["file"]}',
                  fontsize=14, fontweight='bold', y=0.995)
-    plt.tight_layout(rect=[0, 0, 1, 0.99])
-    plt.savefig(output_path, dpi=150, bbox_inches='tight')
+    fig.tight_layout(rect=[0, 0, 1, 0.99])
+    fig.savefig(output_path, dpi=150, bbox_inches='tight')
     print(f"\nPlot saved to: {output_path}")
-    plt.close()
-
-
-def print_specs_report(specs):
-    """Print detailed specifications report."""
-    print(f"\n{'='*70}")
-    print("EDF FILE SPECIFICATIONS")
-    print(f"{'='*70}\n")
-
-    print(f"File: {specs['file']}")
-    print(f"Duration: {specs['duration_hours']:.2f} hours")
-    print(f"Start time: {specs['start_datetime']}")
-    print()
+    if own_figure:
+        plt.close(fig)
+
+
+def format_specs_report(specs):
+    """Format detailed specifications report."""
+    lines = [
+        f"\n{'='*70}",
+        "EDF FILE SPECIFICATIONS",
+        f"{'='*70}\n",
+        f"File: {specs['file']}",
+        f"Duration: {specs['duration_hours']:.2f} hours",
+        f"Start time: {specs['start_datetime']}",
+        ""
+    ]
 
     for ch_name in ['CHIN', 'RLEG', 'LLEG']:
         if specs['channels'][ch_name] is None:
             continue
 
         ch = specs['channels'][ch_name]
-        print(f"\n{'-'*70}")
-        print(f"{ch_name} EMG (Channel {ch['index']}): {ch['label']}")
-        print(f"{'-'*70}")
-        print(f"  Sampling Rate:      {ch['sample_freq']} Hz")
-        print(f"  Physical Dimension: {ch['physical_dim']}")
-        print(f"  Physical Min:       {ch['physical_min']:.2f} {ch['physical_dim']}")
-        print(f"  Physical Max:       {ch['physical_max']:.2f} {ch['physical_dim']}")
-        print(f"  Digital Min:        {ch['digital_min']}")
-        print(f"  Digital Max:        {ch['digital_max']}")
-        print(f"  Prefiltering:       {ch['prefilter'] if ch['prefilter'] else 'None'}")
-        print(f"  Transducer:         {ch['transducer'] if ch['transducer'] else 'Not specified'}")
-        print()
-        print("  Signal Statistics:")
         stats = ch['stats']
-        print(f"    Mean:     {stats['mean']:>10.2f} {ch['physical_dim']}")
-        print(f"    Std Dev:  {stats['std']:>10.2f} {ch['physical_dim']}")
-        print(f"    RMS:      {stats['rms']:>10.2f} {ch['physical_dim']}")
-        print(f"    Range:    {stats['range']:>10.2f} {ch['physical_dim']}")
-
-
-def print_frequency_report(freq_analysis):
-    """Print frequency analysis report."""
-    print(f"\n{'='*70}")
-    print("FREQUENCY CONTENT ANALYSIS")
-    print(f"{'='*70}\n")
+        lines += [
+            f"\n{'-'*70}",
+            f"{ch_name} EMG (Channel {ch['index']}): {ch['label']}",
+            f"{'-'*70}",
+            f"  Sampling Rate:      {ch['sample_freq']} Hz",
+            f"  Physical Dimension: {ch['physical_dim']}",
+            f"  Physical Min:       {ch['physical_min']:.2f} {ch['physical_dim']}",
+            f"  Physical Max:       {ch['physical_max']:.2f} {ch['physical_dim']}",
+            f"  Digital Min:        {ch['digital_min']}",
+            f"  Digital Max:        {ch['digital_max']}",
+            f"  Prefiltering:       {ch['prefilter'] if ch['prefilter'] else 'None'}",
+            f"  Transducer:         {ch['transducer'] if ch['transducer'] else 'Not specified'}",
+            "",
+            "  Signal Statistics:",
+            f"    Mean:     {stats['mean']:>10.2f} {ch['physical_dim']}",
+            f"    Std Dev:  {stats['std']:>10.2f} {ch['physical_dim']}",
+            f"    RMS:      {stats['rms']:>10.2f} {ch['physical_dim']}",
+            f"    Range:    {stats['range']:>10.2f} {ch['physical_dim']}"
+        ]
+
+    return "\n".join(lines) + "\n"
+
+
+def format_frequency_report(freq_analysis):
+    """Format frequency analysis report."""
+    lines = [
+        f"\n{'='*70}",
+        "FREQUENCY CONTENT ANALYSIS",
+        f"{'='*70}\n"
+    ]
 
     for ch_name in ['CHIN', 'RLEG', 'LLEG']:
         if ch_name not in freq_analysis:
             continue
 
         freq = freq_analysis[ch_name]
-        print(f"\n{ch_name} EMG:")
-        print(f"  Peak Frequency: {freq['peak_freq']:.1f} Hz")
-        print(f"  Power Distribution:")
+        lines += [
+            f"\n{ch_name} EMG:",
+            f"  Peak Frequency: {freq['peak_freq']:.1f} Hz",
+            "  Power Distribution:"
+        ]
 
         for band, percentage in freq['band_percentages'].items():
             bar_length = int(percentage / 2)  # Scale for display
             bar = '█' * bar_length
-            print(f"    {band:25s} {percentage:5.1f}% {bar}")
+            lines.append(f"    {band:25s} {percentage:5.1f}% {bar}")
+
+    return "\n".join(lines) + "\n"
+
+
+def print_specs_report(specs):
+    """Print detailed specifications report."""
+    sys.stdout.write(format_specs_report(specs))
+
+
+def print_frequency_report(freq_analysis):
+    """Print frequency analysis report."""
+    sys.stdout.write(format_frequency_report(freq_analysis))
+
+
+def analyze_edf_file(edf_path):
+    """Extract specifications and frequency content for one EDF file."""
+    return extract_edf_specs(str(edf_path))
 
 
 def main():
@@ -276,35 +422,37 @@ def main():
         clinical_db / "Test2.EDF"
     ]
 
-    # Analyze each file
+    existing_files = []
     for edf_path in edf_files:
         if not edf_path.exists():
             print(f"Error: File not found: {edf_path}")
             continue
+        existing_files.append(edf_path)
+
+    if not existing_files:
+        return
+
+    # One figure is reused for every file's plot
+    fig = plt.figure(figsize=(16, 12))
+
+    # Analyze files in parallel; reports and plots are produced here in
+    # file order so the console output stays readable
+    with ProcessPoolExecutor(max_workers=len(existing_files)) as executor:
+        futures = [executor.submit(analyze_edf_file, edf_path) for edf_path in existing_files]
+
+        for edf_path, future in zip(existing_files, futures):
+            specs, freq_analysis = future.result()
+
+            # Print reports (one write for both)
+            sys.stdout.write(format_specs_report(specs) + format_frequency_report(freq_analysis))
+
+            # Create plot
+            plot_path = plots_dir / f"{edf_path.stem}_raw_signal_analysis.png"
+            create_analysis_plot(specs, freq_analysis, str(plot_path), fig=fig)
+
+            print(f"\n{'='*70}\n")
 
-        # Extract specifications
-        specs = extract_edf_specs(str(edf_path))
-
-        # Analyze frequency content
-        freq_analysis = {}
-        for ch_name in ['CHIN', 'RLEG', 'LLEG']:
-            if specs['channels'][ch_name] is not None:
-                ch_data = specs['channels'][ch_name]
-                freq_analysis[ch_name] = analyze_frequency_content(
-                    ch_data['signal'],
-                    ch_data['sample_freq'],
-                    ch_name
-                )
-
-        # Print reports
-        print_specs_report(specs)
-        print_frequency_report(freq_analysis)
-
-        # Create plot
-        plot_path = plots_dir / f"{edf_path.stem}_raw_signal_analysis.png"
-        create_analysis_plot(specs, freq_analysis, str(plot_path))
-
-        print(f"\n{'='*70}\n")
+    plt.close(fig)
 
 
 if __name__ == "__main__":
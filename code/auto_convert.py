@@ -16,13 +16,17 @@ Usage:
     python auto_convert.py <DIRECTORY>  # Process all EDF files in directory
 """
 
+import io
 import os
 import sys
-import subprocess
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import redirect_stdout
 from pathlib import Path
 
-# Import detection utility
+# Import detection utility and converters (run in-process, imported once)
 from detect_edf_format import detect_edf_format
+from convert_edf_annotations import convert_edf_annotations
+from convert_excel_annotations import convert_excel_annotations
 
 
 def convert_single_file(edf_path, verbose=True):
@@ -90,13 +94,12 @@ def convert_single_file(edf_path, verbose=True):
                 print(f"  → Using: {converter_used}")
                 print()
 
-            script_path = Path(__file__).parent / converter_used
-            cmd = [sys.executable, str(script_path), str(edf_path)]
+            converter_output = io.StringIO()
+            with redirect_stdout(converter_output):
+                converted = convert_edf_annotations(str(edf_path), quiet=True)
 
-            proc = subprocess.run(cmd, capture_output=True, text=True)
-
-            if proc.returncode != 0:
-                error = f"Converter failed: {proc.stderr}"
+            if not converted:
+                error = f"Converter failed: {converter_output.getvalue().strip()}"
             else:
                 # Expected output files
                 base_name = edf_path.stem
@@ -123,14 +126,16 @@ def convert_single_file(edf_path, verbose=True):
             if verbose:
                 print("  [Step 1/2] Converting EDF to EDF+C (pyedflib compatible)...")
 
-            edf_converter_path = Path(__file__).parent / 'convert_standard_to_edfplus.py'
+            # Imported here: mne is heavy and only needed for Standard EDF
+            from convert_standard_to_edfplus import convert_standard_to_edfplus
+
             edfplus_output = edf_path.parent / f"{edf_path.stem}_edfplus.edf"
 
-            cmd_edf = [sys.executable, str(edf_converter_path), str(edf_path), str(edfplus_output)]
-            proc_edf = subprocess.run(cmd_edf, capture_output=True, text=True)
+            with redirect_stdout(io.StringIO()):
+                edf_result = convert_standard_to_edfplus(edf_path, edfplus_output)
 
-            if proc_edf.returncode != 0:
-                error = f"EDF conversion failed: {proc_edf.stderr}"
+            if not edf_result['success']:
+                error = f"EDF conversion failed: {edf_result['error']}"
             else:
                 if verbose:
                     print(f"    ✓ EDF+C file created: {edfplus_output.name}")
@@ -140,13 +145,12 @@ def convert_single_file(edf_path, verbose=True):
                 if verbose:
                     print("  [Step 2/2] Converting annotations from Excel...")
 
-                annotation_converter_path = Path(__file__).parent / 'convert_excel_annotations.py'
-                cmd_anno = [sys.executable, str(annotation_converter_path), str(edf_path), result['excel_file']]
+                anno_output = io.StringIO()
+                with redirect_stdout(anno_output):
+                    anno_result = convert_excel_annotations(edf_path, result['excel_file'])
 
-                proc_anno = subprocess.run(cmd_anno, capture_output=True, text=True)
-
-                if proc_anno.returncode != 0:
-                    error = f"Annotation conversion failed: {proc_anno.stderr}"
+                if not anno_result['success']:
+                    error = f"Annotation conversion failed: {anno_result['error']}"
                 else:
                     # Expected output files
                     base_name = edf_path.stem
@@ -159,8 +163,8 @@ def convert_single_file(edf_path, verbose=True):
                     ]
 
                     # Print converter output
-                    if verbose and proc_anno.stdout:
-                        for line in proc_anno.stdout.split('\n'):
+                    if verbose and anno_output.getvalue():
+                        for line in anno_output.getvalue().split('\n'):
                             if '✓' in line or 'events' in line.lower():
                                 print(f"    {line}")
 
@@ -239,28 +243,45 @@ def convert_directory(directory_path, verbose=True):
     print("="*60)
     print()
 
-    results = []
+    results_by_file = {}
     success_count = 0
     failed_count = 0
 
-    for i, edf_file in enumerate(edf_files, 1):
-        print(f"[{i}/{len(edf_files)}] {edf_file.name}")
-        print("-"*60)
-
-        result = convert_single_file(edf_file, verbose=False)
-        results.append({
-            'file': str(edf_file),
-            'result': result
-        })
+    # Files are independent, so convert them in parallel and report each
+    # one as it finishes
+    max_workers = min(8, os.cpu_count() or 1, len(edf_files))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(convert_single_file, edf_file, False): edf_file
+                   for edf_file in edf_files}
+
+        for i, future in enumerate(as_completed(futures), 1):
+            edf_file = futures[future]
+            print(f"[{i}/{len(edf_files)}] {edf_file.name}")
+            print("-"*60)
+
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {
+                    'success': False,
+                    'converter_used': None,
+                    'output_files': [],
+                    'error': str(e)
+                }
+            results_by_file[edf_file] = result
+
+            if result['success']:
+                print(f"  ✓ Success ({result['converter_used']})")
+                success_count += 1
+            else:
+                print(f"  ✗ Failed: {result['error']}")
+                failed_count += 1
 
-        if result['success']:
-            print(f"  ✓ Success ({result['converter_used']})")
-            success_count += 1
-        else:
-            print(f"  ✗ Failed: {result['error']}")
-            failed_count += 1
+            print()
 
-        print()
+    # Keep per-file results in directory order
+    results = [{'file': str(edf_file), 'result': results_by_file[edf_file]}
+               for edf_file in edf_files]
 
     # Summary
     print("="*60)
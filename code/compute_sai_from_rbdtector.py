@@ -6,23 +6,38 @@ and derives the Sleep Atonia Index as described by Ferri et al. (2010).
 
 The tool intentionally avoids heavy third-party dependencies (e.g. pandas) so it
 can run inside restricted environments. Excel files are parsed through the OOXML
-structure using the standard library.
+structure using the standard library; ``lxml`` is used instead when installed.
 """
 from __future__ import annotations
 
 import argparse
 import csv
 import datetime as dt
+import os
+import pickle
 import sys
-from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional
-from xml.etree import ElementTree as ET
-from zipfile import ZipFile
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+from zipfile import ZipFile, ZipInfo
+
+try:
+    from lxml import etree as ET
+    HAVE_LXML = True
+except ImportError:  # stdlib fallback
+    from xml.etree import ElementTree as ET
+    HAVE_LXML = False
 
 NS = {"a": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+SHEET_DATA_TAG = f"{{{NS['a']}}}sheetData"
+ROW_TAG = f"{{{NS['a']}}}row"
+TEXT_TAG = f"{{{NS['a']}}}t"
+# lxml filters events at the C layer; the stdlib parser reports every element
+ITERPARSE_KWARGS = {"tag": (SHEET_DATA_TAG, ROW_TAG)} if HAVE_LXML else {}
 SHEET_PATH = "xl/worksheets/sheet1.xml"
 SHARED_STRINGS_PATH = "xl/sharedStrings.xml"
+DEFAULT_CACHE_PATH = Path("~/.cache/rbdtector_sai.pkl")
 DEFAULT_RESULTS_DIR = (Path(__file__).resolve().parent / "../RBDtector/tests/data/RBDtector output").resolve()
 
 EXPECTED_KEYS = {
@@ -34,9 +49,12 @@ EXPECTED_KEYS = {
 }
 
 
-@dataclass
+@dataclass(frozen=True)
 class SaiMetrics:
-    """Container for SAI-relevant values extracted from a workbook."""
+    """Container for SAI-relevant values extracted from a workbook.
+
+    The derived atonia counts and SAI fraction are computed once on creation.
+    """
 
     source: Path
     subject_id: str
@@ -44,21 +62,20 @@ class SaiMetrics:
     macro_total: float
     chin_tonic_abs: float
     chin_any_abs: float
-
-    @property
-    def mini_atonia(self) -> float:
-        return self.mini_total - self.chin_any_abs
-
-    @property
-    def macro_atonia(self) -> float:
-        return self.macro_total - self.chin_tonic_abs
-
-    @property
-    def sai_fraction(self) -> Optional[float]:
+    mini_atonia: float = field(init=False)
+    macro_atonia: float = field(init=False)
+    sai_fraction: Optional[float] = field(init=False)
+    sai_percent: Optional[float] = field(init=False)
+
+    def __post_init__(self) -> None:
+        mini_atonia = self.mini_total - self.chin_any_abs
+        macro_atonia = self.macro_total - self.chin_tonic_abs
         denominator = self.mini_total + self.macro_total
-        if denominator == 0:
-            return None
-        return (self.mini_atonia + self.macro_atonia) / denominator
+        sai_fraction = None if denominator == 0 else (mini_atonia + macro_atonia) / denominator
+        object.__setattr__(self, "mini_atonia", mini_atonia)
+        object.__setattr__(self, "macro_atonia", macro_atonia)
+        object.__setattr__(self, "sai_fraction", sai_fraction)
+        object.__setattr__(self, "sai_percent", None if sai_fraction is None else sai_fraction * 100)
 
     def as_csv_row(self) -> Dict[str, Optional[float]]:
         return {
@@ -71,7 +88,7 @@ class SaiMetrics:
             "mini_atonia": self.mini_atonia,
             "macro_atonia": self.macro_atonia,
             "sai_fraction": self.sai_fraction,
-            "sai_percent": None if self.sai_fraction is None else self.sai_fraction * 100,
+            "sai_percent": self.sai_percent,
         }
 
 
@@ -87,31 +104,60 @@ def iter_cells(row) -> Iterable[ET.Element]:  # type: ignore[override]
 def column_ref(cell_ref: str) -> str:
     """Return the column letters from a cell reference (e.g. ``AZ12`` -> ``AZ``)."""
 
-    letters = []
-    for ch in cell_ref:
-        if ch.isalpha():
-            letters.append(ch)
-        else:
-            break
-    return "".join(letters)
+    return cell_ref.rstrip("0123456789")
 
 
-def read_shared_strings(zf: ZipFile) -> List[str]:
-    try:
-        data = zf.read(SHARED_STRINGS_PATH)
-    except KeyError:
+def _open_entry(zf: ZipFile, name_map: Dict[str, ZipInfo], name: str) -> Optional[IO[bytes]]:
+    """Open an archive member as a stream, returning ``None`` if it is absent."""
+
+    info = name_map.get(name)
+    if info is None:
+        return None
+    return zf.open(info)
+
+
+def read_shared_strings(zf: ZipFile, name_map: Dict[str, ZipInfo]) -> List[str]:
+    stream = _open_entry(zf, name_map, SHARED_STRINGS_PATH)
+    if stream is None:
         return []
-    root = ET.fromstring(data)
-    strings: List[str] = []
-    for si in root.findall("a:si", NS):
-        text_parts = []
-        for node in si.findall('.//a:t', NS):
-            text_parts.append(node.text or "")
-        strings.append("".join(text_parts))
+    with stream:
+        root = ET.parse(stream).getroot()
+    try:
+        count = int(root.get("uniqueCount") or root.get("count") or 0)
+    except ValueError:
+        count = 0
+    # uniqueCount lets us size the table up front; trust it only as far as it goes
+    strings: List[str] = [""] * count
+    for i, si in enumerate(root.findall("a:si", NS)):
+        text = "".join(node.text or "" for node in si.iter(TEXT_TAG))
+        if i < count:
+            strings[i] = text
+        else:
+            strings.append(text)
     return strings
 
 
-def cell_value(cell: ET.Element, shared: List[str]) -> Optional[float | str]:
+class LazySharedStrings(Sequence[str]):
+    """Shared-strings table that is only read on the first ``t="s"`` lookup."""
+
+    def __init__(self, zf: ZipFile, name_map: Dict[str, ZipInfo]) -> None:
+        self._zf = zf
+        self._name_map = name_map
+        self._strings: Optional[List[str]] = None
+
+    def _load(self) -> List[str]:
+        if self._strings is None:
+            self._strings = read_shared_strings(self._zf, self._name_map)
+        return self._strings
+
+    def __getitem__(self, idx):  # type: ignore[override]
+        return self._load()[idx]
+
+    def __len__(self) -> int:
+        return len(self._load())
+
+
+def cell_value(cell: ET.Element, shared: Sequence[str]) -> Optional[float | str]:
     cell_type = cell.get("t")
     if cell_type == "inlineStr":
         text_node = cell.find("a:is/a:t", NS)
@@ -129,71 +175,72 @@ def cell_value(cell: ET.Element, shared: List[str]) -> Optional[float | str]:
     if value_node is None or value_node.text is None:
         return None
     raw = value_node.text
-    try:
-        return float(raw)
-    except ValueError:
-        return raw
+    # Only attempt float() on values that can plausibly be numbers
+    # (including "inf"/"nan", which float() accepts in any case)
+    if cell_type == "n" or (raw and (raw[0].isdigit() or raw[0] in "-+.iInN")):
+        try:
+            return float(raw)
+        except ValueError:
+            pass
+    return raw
 
 
-def parse_rows(sheet_xml: bytes, shared: List[str]) -> Dict[int, Dict[str, Optional[float | str]]]:
-    root = ET.fromstring(sheet_xml)
-    sheet_data = root.find("a:sheetData", NS)
-    if sheet_data is None:
-        raise WorkbookParsingError("Missing sheetData block in worksheet")
+def iter_rows(source: IO[bytes], shared: Sequence[str]) -> Iterator[Dict[str, Optional[float | str]]]:
+    """Yield ``{column: value}`` for each row in document order.
 
-    rows: Dict[int, Dict[str, Optional[float | str]]] = {}
-    for row in sheet_data.findall("a:row", NS):
-        raw_index = row.get("r")
-        if raw_index is None:
+    The worksheet is parsed incrementally and each row is discarded once it has
+    been yielded, so memory stays bounded by a single row.
+    """
+    sheet_data = None
+    for event, elem in ET.iterparse(source, events=("start", "end"), **ITERPARSE_KWARGS):
+        if event == "start":
+            if elem.tag == SHEET_DATA_TAG:
+                sheet_data = elem
             continue
-        try:
-            idx = int(raw_index)
-        except ValueError:
+        if elem.tag != ROW_TAG or sheet_data is None:
             continue
         entries: Dict[str, Optional[float | str]] = {}
-        for cell in iter_cells(row):
+        for cell in iter_cells(elem):
             ref = cell.get("r")
             if ref is None:
                 continue
-            col = column_ref(ref)
-            entries[col] = cell_value(cell, shared)
-        rows[idx] = entries
-    return rows
-
-
-def extract_metrics_from_rows(rows: Dict[int, Dict[str, Optional[float | str]]]) -> SaiMetrics:
-    header_row_index: Optional[int] = None
-    headers: Dict[str, str] = {}
-    for index in sorted(rows):
-        values = rows[index]
-        header_matches = {col: val for col, val in values.items() if isinstance(val, str)}
-        if any(str(val).strip() == "Subject ID" for val in header_matches.values()):
-            header_row_index = index
-            headers = {col: str(val).strip() for col, val in header_matches.items() if isinstance(val, str)}
-            break
-    if header_row_index is None:
-        raise WorkbookParsingError("Could not locate header row containing 'Subject ID'.")
+            entries[column_ref(ref)] = cell_value(cell, shared)
+        yield entries
+        # Drop the processed row from the partially built tree
+        sheet_data.clear()
+    if sheet_data is None:
+        raise WorkbookParsingError("Missing sheetData block in worksheet")
 
-    missing_keys = EXPECTED_KEYS.difference(headers.values())
-    if missing_keys:
-        raise WorkbookParsingError(f"Header row missing expected labels: {sorted(missing_keys)}")
 
-    name_to_col = {label: col for col, label in headers.items()}
-    subject_col = name_to_col["Subject ID"]
+def stream_extract_metrics(source: IO[bytes], shared: Sequence[str]) -> SaiMetrics:
+    """Walk the sheet once and stop at the first data row below the header."""
 
-    data_row: Optional[Dict[str, Optional[float | str]]] = None
-    for index in sorted(rows):
-        if index <= header_row_index:
+    name_to_col: Optional[Dict[str, str]] = None
+    subject_col = ""
+    for values in iter_rows(source, shared):
+        if name_to_col is None:
+            headers = {col: val.strip() for col, val in values.items() if isinstance(val, str)}
+            if "Subject ID" not in headers.values():
+                continue
+            missing_keys = EXPECTED_KEYS.difference(headers.values())
+            if missing_keys:
+                raise WorkbookParsingError(f"Header row missing expected labels: {sorted(missing_keys)}")
+            name_to_col = {label: col for col, label in headers.items()}
+            subject_col = name_to_col["Subject ID"]
             continue
-        row_values = rows[index]
-        subject_value = row_values.get(subject_col)
+        subject_value = values.get(subject_col)
         if subject_value in (None, ""):
             continue
-        data_row = row_values
-        break
-    if data_row is None:
-        raise WorkbookParsingError("No data row found after header row.")
+        return build_metrics(values, name_to_col, subject_col)
+
+    if name_to_col is None:
+        raise WorkbookParsingError("Could not locate header row containing 'Subject ID'.")
+    raise WorkbookParsingError("No data row found after header row.")
+
 
+def build_metrics(
+    data_row: Dict[str, Optional[float | str]], name_to_col: Dict[str, str], subject_col: str
+) -> SaiMetrics:
     def grab(label: str) -> float:
         col = name_to_col[label]
         value = data_row.get(col)
@@ -222,15 +269,57 @@ def extract_metrics_from_rows(rows: Dict[int, Dict[str, Optional[float | str]]])
 
 def parse_workbook(path: Path) -> SaiMetrics:
     with ZipFile(path) as zf:
-        shared_strings = read_shared_strings(zf)
-        try:
-            sheet_xml = zf.read(SHEET_PATH)
-        except KeyError as exc:
-            raise WorkbookParsingError(f"Worksheet '{SHEET_PATH}' not found in {path}") from exc
-    rows = parse_rows(sheet_xml, shared_strings)
-    metrics = extract_metrics_from_rows(rows)
-    metrics.source = path
-    return metrics
+        name_map = {info.filename: info for info in zf.infolist()}
+        shared_strings = LazySharedStrings(zf, name_map)
+        stream = _open_entry(zf, name_map, SHEET_PATH)
+        if stream is None:
+            raise WorkbookParsingError(f"Worksheet '{SHEET_PATH}' not found in {path}")
+        # Inflate and parse in lockstep rather than materialising the sheet XML
+        with stream:
+            metrics = stream_extract_metrics(stream, shared_strings)
+    return replace(metrics, source=path)
+
+
+def _parse_workbook_safe(path: Path) -> Tuple[Path, Union[SaiMetrics, Exception]]:
+    """Pool-friendly wrapper: return the exception instead of raising it."""
+
+    try:
+        return path, parse_workbook(path)
+    except Exception as exc:
+        return path, exc
+
+
+CacheKey = Tuple[str, int, int]
+CacheEntry = Tuple[str, float, float, float, float]
+
+
+def cache_key(path: Path) -> CacheKey:
+    stat = path.stat()
+    return str(path), stat.st_mtime_ns, stat.st_size
+
+
+def load_cache(cache_path: Path) -> Dict[CacheKey, CacheEntry]:
+    """Load previously parsed metrics; a missing or unreadable cache is treated as empty."""
+
+    try:
+        with cache_path.open("rb") as fp:
+            cache = pickle.load(fp)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+
+def save_cache(cache_path: Path, cache: Dict[CacheKey, CacheEntry]) -> None:
+    """Write the cache atomically (temp file + rename); failures are not fatal."""
+
+    tmp_path = cache_path.with_name(cache_path.name + ".tmp")
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with tmp_path.open("wb") as fp:
+            pickle.dump(cache, fp, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except OSError as exc:
+        print(f"Warning: could not write cache {cache_path}: {exc}", file=sys.stderr)
 
 
 def collect_workbooks(path: Path) -> List[Path]:
@@ -300,6 +389,21 @@ def build_parser() -> argparse.ArgumentParser:
         action="store_true",
         help="Suppress per-file console output; only print the summary path.",
     )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes used to parse workbooks (default: CPU count).",
+    )
+    parser.add_argument(
+        "--cache",
+        type=Path,
+        default=DEFAULT_CACHE_PATH,
+        help=(
+            "Pickle file caching parsed workbooks keyed by path, mtime and size "
+            "(default: ~/.cache/rbdtector_sai.pkl)."
+        ),
+    )
     return parser
 
 
@@ -325,23 +429,62 @@ def main(argv: Optional[List[str]] = None) -> int:
 
     results: List[SaiMetrics] = []
     errors: List[str] = []
+    messages: List[str] = []
 
-    for workbook in workbook_paths:
-        try:
-            metrics = parse_workbook(workbook)
-            results.append(metrics)
-            if not args.quiet:
-                fraction = metrics.sai_fraction
-                percent = "n/a" if fraction is None else f"{fraction * 100:.2f}%"
-                print(f"{workbook}: SAI={percent} (subject={metrics.subject_id})")
-        except WorkbookParsingError as exc:
-            errors.append(f"{workbook}: {exc}")
-        except Exception as exc:  # unexpected errors bubble up separately
-            errors.append(f"{workbook}: unexpected error {exc}")
+    cache_path = args.cache.expanduser()
+    cache = load_cache(cache_path)
+    keys = {workbook: cache_key(workbook) for workbook in workbook_paths}
+    pending = [workbook for workbook in workbook_paths if keys[workbook] not in cache]
+
+    jobs = max(1, min(args.jobs, len(pending)))
+    if jobs == 1:
+        parsed = map(_parse_workbook_safe, pending)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=jobs)
+        parsed = executor.map(_parse_workbook_safe, pending, chunksize=4)
+
+    try:
+        for workbook in workbook_paths:
+            entry = cache.get(keys[workbook])
+            if entry is not None:
+                outcome: Union[SaiMetrics, Exception] = SaiMetrics(workbook, *entry)
+            else:
+                _, outcome = next(parsed)
+                if isinstance(outcome, SaiMetrics):
+                    cache[keys[workbook]] = (
+                        outcome.subject_id,
+                        outcome.mini_total,
+                        outcome.macro_total,
+                        outcome.chin_tonic_abs,
+                        outcome.chin_any_abs,
+                    )
+            if isinstance(outcome, WorkbookParsingError):
+                errors.append(f"{workbook}: {outcome}")
+            elif isinstance(outcome, Exception):  # unexpected errors reported separately
+                errors.append(f"{workbook}: unexpected error {outcome}")
+            else:
+                results.append(outcome)
+                if not args.quiet:
+                    fraction = outcome.sai_fraction
+                    percent = "n/a" if fraction is None else f"{fraction * 100:.2f}%"
+                    messages.append(f"{workbook}: SAI={percent} (subject={outcome.subject_id})\n")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    if pending:
+        # Drop stale entries for files that changed since they were cached
+        current = set(keys.values())
+        seen_paths = {key[0] for key in current}
+        cache = {key: entry for key, entry in cache.items() if key in current or key[0] not in seen_paths}
+        save_cache(cache_path, cache)
+
+    # One write for all per-file lines instead of a print per workbook
+    sys.stdout.write("".join(messages))
 
     if not results:
-        for line in errors:
-            print(line, file=sys.stderr)
+        sys.stderr.write("".join(f"{line}\n" for line in errors))
         parser.error("Failed to compute SAI for any input file.")
         return 2
 
@@ -350,9 +493,10 @@ def main(argv: Optional[List[str]] = None) -> int:
         print(f"\nWrote aggregated results to: {output_path}")
 
     if errors:
-        print("\nEncountered issues while processing some files:", file=sys.stderr)
-        for line in errors:
-            print(f"  - {line}", file=sys.stderr)
+        sys.stderr.write(
+            "\nEncountered issues while processing some files:\n"
+            + "".join(f"  - {line}\n" for line in errors)
+        )
 
     return 0
 
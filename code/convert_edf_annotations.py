@@ -1,15 +1,30 @@
 
 import pyedflib
-import datetime
 import os
+import sys
 import numpy as np
 import argparse
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
 
-def convert_edf_annotations(edf_path):
+WRITE_BUFFER_SIZE = 1 << 20
+
+# Annotation categories, checked in this order
+SLEEP_STAGE_KEYWORD = "Sleep stage"
+AROUSAL_KEYWORD = "arousal"  # case-insensitive
+FLOW_KEYWORDS = ("Apnea", "Hyp", "Desat")
+
+def convert_edf_annotations(edf_path, quiet=False):
     """
     Reads annotations from an EDF file and converts them into separate .txt files
     for sleep stages, arousals, and flow events, formatted for RBDtector.
+
+    Progress messages are collected and printed in one go at the end; quiet=True
+    suppresses them. Returns True on success, False if an error occurred (the
+    error is always printed).
     """
+    messages = []
     try:
         f = pyedflib.EdfReader(edf_path)
         
@@ -22,131 +37,161 @@ def convert_edf_annotations(edf_path):
         output_dir = os.path.dirname(edf_path)
 
         # --- Categorize Annotations ---
-        sleep_stages = []
-        arousals = []
-        flow_events = []
-
-        for i in range(annotations[0].size):
-            onset_sec = annotations[0][i]
-            duration_sec = annotations[1][i]
-            event_text = annotations[2][i]
-
-            # Calculate onset and end datetimes with full precision
-            onset_dt_full = start_datetime + datetime.timedelta(seconds=onset_sec)
-            end_dt_full = onset_dt_full + datetime.timedelta(seconds=duration_sec)
-
-            # Also create rounded versions for internal use (pandas alignment)
-            onset_dt = onset_dt_full.replace(microsecond=0)
-            end_dt = end_dt_full.replace(microsecond=0)
-
-            event_data = {
-                "onset_dt": onset_dt,  # For internal processing
-                "onset_dt_full": onset_dt_full,  # For file writing with full precision
-                "end_dt": end_dt,
-                "end_dt_full": end_dt_full,
-                "event_text": event_text
-            }
-
-            if "Sleep stage" in event_text:
-                sleep_stages.append(event_data)
-            elif "arousal" in event_text.lower():
-                arousals.append(event_data)
-            elif any(keyword in event_text for keyword in ["Apnea", "Hyp", "Desat"]):
-                flow_events.append(event_data)
+        # Onsets/ends as datetime64[us]; timedelta(seconds=x) also rounds to the microsecond
+        start64 = np.datetime64(start_datetime, 'us')
+        onset_us = np.rint(np.asarray(annotations[0], dtype=np.float64) * 1e6).astype(np.int64)
+        duration_us = np.rint(np.asarray(annotations[1], dtype=np.float64) * 1e6).astype(np.int64)
+        onsets_full = start64 + onset_us.astype('timedelta64[us]')
+        ends_full = onsets_full + duration_us.astype('timedelta64[us]')
+        texts = np.asarray(annotations[2], dtype=str)
+
+        is_stage = np.char.find(texts, SLEEP_STAGE_KEYWORD) >= 0
+        is_arousal = ~is_stage & (np.char.find(np.char.lower(texts), AROUSAL_KEYWORD) >= 0)
+        is_flow = ~is_stage & ~is_arousal & np.logical_or.reduce(
+            [np.char.find(texts, keyword) >= 0 for keyword in FLOW_KEYWORDS]
+        )
+
+        sleep_stages = _collect_events(onsets_full, ends_full, texts, is_stage)
+        arousals = _collect_events(onsets_full, ends_full, texts, is_arousal)
+        flow_events = _collect_events(onsets_full, ends_full, texts, is_flow)
         
         f.close()
 
         # --- Determine Effective Start Time ---
         # Use the timestamp of the first sleep stage annotation as the start time
         # This aligns with RBDtector's behavior of trimming signal to sleep stages
-        if sleep_stages:
-            effective_start = sleep_stages[0]["onset_dt"]
-            print(f"  EDF header start: {start_datetime}")
-            print(f"  First sleep stage: {effective_start}")
-            print(f"  Using first sleep stage as start time")
+        if sleep_stages["onset_dt_full"]:
+            effective_start = sleep_stages["onset_dt_full"][0].replace(microsecond=0)
+            messages.append(f"  EDF header start: {start_datetime}")
+            messages.append(f"  First sleep stage: {effective_start}")
+            messages.append(f"  Using first sleep stage as start time")
         else:
             effective_start = start_datetime
-            print(f"  Warning: No sleep stages found, using EDF start time")
+            messages.append(f"  Warning: No sleep stages found, using EDF start time")
 
         # CRITICAL: Round to nearest second to avoid pandas resample() alignment issues
         # pandas resample('3s') aligns to 3-second boundaries, which causes index mismatch
         # if timestamps have microsecond precision. This leads to NaN values that astype(bool)
         # converts to True, marking ALL samples as artifacts!
         effective_start = effective_start.replace(microsecond=0)
-        print(f"  Rounded to: {effective_start} (removed microseconds for pandas compatibility)")
+        messages.append(f"  Rounded to: {effective_start} (removed microseconds for pandas compatibility)")
 
         # --- Write Files ---
-        write_sleep_profile(output_dir, base_filename, effective_start, sleep_stages)
-        write_arousals(output_dir, base_filename, effective_start, arousals)
-        write_flow_events(output_dir, base_filename, effective_start, flow_events)
+        for writer, events in ((write_sleep_profile, sleep_stages),
+                               (write_arousals, arousals),
+                               (write_flow_events, flow_events)):
+            filename = writer(output_dir, base_filename, effective_start, events)
+            messages.append(f"Created: {filename}")
         
-        print(f"Successfully converted annotations for {base_filename}")
+        messages.append(f"Successfully converted annotations for {base_filename}")
+        if not quiet:
+            print("\n".join(messages))
+        return True
 
     except Exception as e:
-        print(f"An error occurred while processing {edf_path}: {e}")
+        error = f"An error occurred while processing {edf_path}: {e}"
+        print(error if quiet else "\n".join(messages + [error]))
+        return False
+
+def _collect_events(onsets_full, ends_full, texts, mask):
+    """Returns the masked events as parallel lists; datetimes are built only for these."""
+    onsets = onsets_full[mask]
+    ends = ends_full[mask]
+    # Whole seconds, truncated toward zero like int(timedelta.total_seconds())
+    duration_us = (ends - onsets).astype(np.int64)
+    durations = (np.sign(duration_us) * (np.abs(duration_us) // 1_000_000)).tolist()
+    return {
+        "onset_dt_full": onsets.tolist(),  # Full precision, used for file writing
+        "end_dt_full": ends.tolist(),
+        "duration_s": durations,
+        "event_text": texts[mask].tolist(),
+    }
+
+def _hms_us(d):
+    """Formats a datetime as HH:MM:SS,ffffff without going through strftime."""
+    return f"{d.hour:02d}:{d.minute:02d}:{d.second:02d},{d.microsecond:06d}"
+
+def _format_interval_lines(events):
+    """Builds 'onset-end; duration;event_name' lines for arousal/flow files."""
+    lines = []
+    for onset, end, duration, event_text in zip(
+        events["onset_dt_full"], events["end_dt_full"], events["duration_s"], events["event_text"]
+    ):
+        # No spaces around dash, include duration field
+        lines.append(f"{_hms_us(onset)}-{_hms_us(end)}; {duration};{event_text}\n")
+    return lines
+
+def _write_lines(filename, lines):
+    """Writes all lines of an output file in one call through a large buffer."""
+    with open(filename, 'w', encoding='utf-8', buffering=WRITE_BUFFER_SIZE) as f:
+        f.writelines(lines)
+    return filename
 
 def write_sleep_profile(output_dir, base_filename, start_dt, events):
-    """Writes the sleep profile txt file."""
+    """Writes the sleep profile txt file and returns its path."""
     filename = os.path.join(output_dir, f"{base_filename} Sleep profile.txt")
-    with open(filename, 'w', encoding='utf-8') as f:
-        # Write header
-        f.write(f"Start Time: {start_dt.strftime('%d.%m.%Y %H:%M:%S')}\n")
-        f.write("Version: 1.0\n\n")
-        
-        # Write events
-        for event in events:
-            time_str = event["onset_dt_full"].strftime('%H:%M:%S,%f')  # Use full precision timestamp
-            stage = event["event_text"].replace("Sleep stage ", "").strip()
-            # RBDtector seems to expect specific stage names
-            if stage == 'R':
-                stage = 'REM'
-            f.write(f"{time_str}; {stage}\n")
-    print(f"Created: {filename}")
+    # Header
+    lines = [
+        f"Start Time: {start_dt.strftime('%d.%m.%Y %H:%M:%S')}\n",
+        "Version: 1.0\n\n",
+    ]
+
+    # Events
+    for onset, event_text in zip(events["onset_dt_full"], events["event_text"]):
+        time_str = _hms_us(onset)  # Use full precision timestamp
+        stage = event_text.replace("Sleep stage ", "").strip()
+        # RBDtector seems to expect specific stage names
+        if stage == 'R':
+            stage = 'REM'
+        lines.append(f"{time_str}; {stage}\n")
+    return _write_lines(filename, lines)
 
 def write_arousals(output_dir, base_filename, start_dt, events):
-    """Writes the classification arousals txt file."""
+    """Writes the classification arousals txt file and returns its path."""
     filename = os.path.join(output_dir, f"{base_filename} Classification Arousals.txt")
-    with open(filename, 'w', encoding='utf-8') as f:
-        # Write header (matching Tutorial format exactly)
-        f.write(f"Signal ID: Arousals\n")
-        f.write(f"Start Time: {start_dt.strftime('%d.%m.%Y %H:%M:%S')}\n")
-        f.write(f"Unit: s\n")
-        f.write(f"Signal Type: Impuls\n\n")
-
-        # Write events (Tutorial format: onset-end; duration;event_name)
-        for event in events:
-            onset_str = event["onset_dt_full"].strftime('%H:%M:%S,%f')  # Use full precision timestamp
-            end_str = event["end_dt_full"].strftime('%H:%M:%S,%f')  # Use full precision timestamp
-            duration = (event["end_dt_full"] - event["onset_dt_full"]).total_seconds()
-            event_name = event["event_text"]
-            # No spaces around dash, include duration field
-            f.write(f"{onset_str}-{end_str}; {int(duration)};{event_name}\n")
-    print(f"Created: {filename}")
+    # Header (matching Tutorial format exactly)
+    lines = [
+        "Signal ID: Arousals\n",
+        f"Start Time: {start_dt.strftime('%d.%m.%Y %H:%M:%S')}\n",
+        "Unit: s\n",
+        "Signal Type: Impuls\n\n",
+    ]
+    # Events (Tutorial format: onset-end; duration;event_name)
+    lines.extend(_format_interval_lines(events))
+    return _write_lines(filename, lines)
 
 def write_flow_events(output_dir, base_filename, start_dt, events):
-    """Writes the flow events txt file."""
+    """Writes the flow events txt file and returns its path."""
     filename = os.path.join(output_dir, f"{base_filename} Flow Events.txt")
-    with open(filename, 'w', encoding='utf-8') as f:
-        # Write header (matching Tutorial format)
-        f.write(f"Signal ID: FlowEvents\n")
-        f.write(f"Start Time: {start_dt.strftime('%d.%m.%Y %H:%M:%S')}\n")
-        f.write(f"Unit: s\n")
-        f.write(f"Signal Type: Impuls\n\n")
-
-        # Write events (Tutorial format: onset-end; duration;event_name)
-        for event in events:
-            onset_str = event["onset_dt_full"].strftime('%H:%M:%S,%f')  # Use full precision timestamp
-            end_str = event["end_dt_full"].strftime('%H:%M:%S,%f')  # Use full precision timestamp
-            duration = (event["end_dt_full"] - event["onset_dt_full"]).total_seconds()
-            event_name = event["event_text"]
-            # No spaces around dash, include duration field
-            f.write(f"{onset_str}-{end_str}; {int(duration)};{event_name}\n")
-    print(f"Created: {filename}")
+    # Header (matching Tutorial format)
+    lines = [
+        "Signal ID: FlowEvents\n",
+        f"Start Time: {start_dt.strftime('%d.%m.%Y %H:%M:%S')}\n",
+        "Unit: s\n",
+        "Signal Type: Impuls\n\n",
+    ]
+    # Events (Tutorial format: onset-end; duration;event_name)
+    lines.extend(_format_interval_lines(events))
+    return _write_lines(filename, lines)
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Convert EDF annotations to RBDtector TXT format.')
-    parser.add_argument('edf_file', type=str, help='Path to the EDF file to process.', default='/Users/hyeongsuk/Desktop/workspace/SNUH/SAI/clinical_db/Test1/test.edf')
+    parser.add_argument('edf_file', type=str, nargs='+', help='EDF file(s) to process; directories are searched recursively for .edf files.')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help='Number of files converted concurrently (default: CPU count).')
+    parser.add_argument('--quiet', action='store_true', help='Only print errors.')
     args = parser.parse_args()
-    
-    convert_edf_annotations(args.edf_file)
+
+    edf_paths = []
+    for arg in args.edf_file:
+        path = Path(arg)
+        if path.is_dir():
+            edf_paths.extend(str(p) for p in sorted(path.rglob('*')) if p.suffix.lower() == '.edf')
+        else:
+            edf_paths.append(arg)
+
+    # pyedflib and file I/O release the GIL, so threads are enough here
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as executor:
+        results = list(executor.map(partial(convert_edf_annotations, quiet=args.quiet), edf_paths))
+
+    sys.exit(0 if all(results) else 1)
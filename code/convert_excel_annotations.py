@@ -15,11 +15,31 @@ Usage:
 """
 
 import os
+import re
 import sys
 import datetime
-import pandas as pd
+from openpyxl import load_workbook
 from pathlib import Path
 
+# openpyxl picks up lxml automatically when it is installed; its read-only
+# sheet parser is considerably faster with it than with the stdlib parser
+try:
+    import lxml  # noqa: F401
+    HAVE_LXML = True
+except ImportError:
+    HAVE_LXML = False
+
+# Sleep profile stage names: "R" is written as "REM", "No Stage" rows are dropped
+STAGE_NAME_MAP = {'W': 'W', 'N1': 'N1', 'N2': 'N2', 'N3': 'N3', 'R': 'REM', 'REM': 'REM'}
+SKIPPED_STAGES = {'No Stage', 'NoStage'}
+
+# "Arousal - Dur: 19.6 sec. - Type" -> "19.6"
+DURATION_PATTERN = re.compile(r'Dur:\s*([\d.]+)\s*sec\.')
+
+# Event times are kept as integer microseconds since midnight
+US_PER_SECOND = 1000000
+US_PER_DAY = 86400 * US_PER_SECOND
+
 
 def convert_excel_annotations(edf_path, excel_path=None):
     """
@@ -61,13 +81,10 @@ def convert_excel_annotations(edf_path, excel_path=None):
         # Read EDF start time from header
         edf_start_time = read_edf_start_time(edf_path)
 
-        # Read Excel annotations
-        df = pd.read_excel(excel_path, sheet_name='Sheet1', header=None)
-
-        # Extract different event types
-        sleep_stages = extract_sleep_stages(df, edf_start_time)
-        arousals = extract_arousals(df, edf_start_time)
-        flow_events = extract_flow_events(df, edf_start_time)
+        # Stream Excel annotation rows straight into the classifier
+        sleep_stages, arousals, flow_events = extract_all_events(
+            read_annotation_rows(excel_path), edf_start_time
+        )
 
         # Get output directory and base filename
         output_dir = edf_path.parent
@@ -93,204 +110,191 @@ def convert_excel_annotations(edf_path, excel_path=None):
 def read_edf_start_time(edf_path):
     """Read start time from EDF header."""
     with open(edf_path, 'rb') as f:
-        header = f.read(256)
-
         # Start date: bytes 168-176 (dd.mm.yy)
         # Start time: bytes 176-184 (hh.mm.ss)
-        start_date_str = header[168:176].decode('ascii', errors='ignore').strip()
-        start_time_str = header[176:184].decode('ascii', errors='ignore').strip()
-
-        # Parse date (dd.mm.yy format)
-        day, month, year = start_date_str.split('.')
-        year = int(year)
-        if year < 100:
-            year += 2000  # Assume 21st century
-
-        # Parse time (hh.mm.ss format)
-        hour, minute, second = start_time_str.split('.')
-
-        start_datetime = datetime.datetime(
-            int(year), int(month), int(day),
-            int(hour), int(minute), int(second)
-        )
+        f.seek(168)
+        buf = f.read(16).decode('ascii', errors='ignore')
 
-        return start_datetime
+    # Fixed-width fields: read day/month/year and hour/minute/second by position
+    start_datetime = datetime.datetime(
+        2000 + int(buf[6:8]), int(buf[3:5]), int(buf[0:2]),  # Assume 21st century
+        int(buf[8:10]), int(buf[11:13]), int(buf[14:16])
+    )
 
+    return start_datetime
 
-def extract_sleep_stages(df, edf_start_time):
-    """Extract sleep stage annotations from Excel."""
-    # Filter rows containing "Stage -"
-    stage_rows = df[df[3].astype(str).str.contains('Stage -', case=False, na=False)]
 
-    stages = []
-
-    for _, row in stage_rows.iterrows():
-        timestamp_str = str(row[2])  # Column 2: timestamp (HH:MM:SS.ff)
-        event_text = str(row[3])     # Column 3: event description
-
-        # Parse timestamp
-        onset_time = parse_timestamp(timestamp_str, edf_start_time)
-
-        # Extract stage name
-        stage_name = event_text.replace('Stage -', '').strip()
-
-        stages.append({
-            'onset_time': onset_time,
-            'stage': stage_name
-        })
+def read_annotation_rows(excel_path):
+    """
+    Read (timestamp, event text) pairs from Sheet1 of the annotation workbook.
 
-    return stages
+    Streams columns C and D (timestamp HH:MM:SS.ff, event description) in
+    openpyxl's read-only mode; empty cells come back as 'nan', as they did
+    when the sheet was read through pandas. Rows are yielded as they are
+    parsed, so the workbook stays open until the generator is exhausted.
+    """
+    wb = load_workbook(str(excel_path), read_only=True, data_only=True, keep_links=False)
+    try:
+        ws = wb['Sheet1']
+        for timestamp, text in ws.iter_rows(min_col=3, max_col=4, values_only=True):
+            yield ('nan' if timestamp is None else str(timestamp), 'nan' if text is None else str(text))
+    finally:
+        wb.close()
 
 
-def extract_arousals(df, edf_start_time):
-    """Extract arousal events from Excel."""
-    arousal_rows = df[df[3].astype(str).str.contains('Arousal -', case=False, na=False)]
+def extract_all_events(rows, edf_start_time):
+    """
+    Classify (timestamp, event text) rows into sleep stages, arousals and
+    flow events in a single pass.
 
+    Matching is case-insensitive on "Stage -", "Arousal -" and
+    "Respiratory Event"/"Desaturation"; a row may land in more than one list.
+    Onset and end times are integer microseconds since midnight.
+    """
+    stages = []
     arousals = []
+    flow_events = []
+
+    # Unparseable timestamps fall back to the recording start time
+    start_us = ((edf_start_time.hour * 60 + edf_start_time.minute) * 60
+                + edf_start_time.second) * US_PER_SECOND + edf_start_time.microsecond
 
-    for _, row in arousal_rows.iterrows():
-        timestamp_str = str(row[2])
-        event_text = str(row[3])
+    for timestamp_str, event_text in rows:
+        lowered = event_text.lower()
+        is_stage = 'stage -' in lowered
+        is_arousal = 'arousal -' in lowered
+        is_flow = 'respiratory event' in lowered or 'desaturation' in lowered
+        if not (is_stage or is_arousal or is_flow):
+            continue
 
         # Parse timestamp
-        onset_time = parse_timestamp(timestamp_str, edf_start_time)
-
-        # Extract duration from text: "Arousal - Dur: 19.6 sec. - Type"
-        duration_sec = 0.0
-        if 'Dur:' in event_text:
-            try:
-                dur_part = event_text.split('Dur:')[1].split('sec.')[0].strip()
-                duration_sec = float(dur_part)
-            except (IndexError, ValueError):
-                pass
-
-        # Extract type (last part after final dash)
-        event_type = "Arousal"
-        if ' - ' in event_text:
-            parts = event_text.split(' - ')
-            if len(parts) >= 3:
-                event_type = parts[-1].strip()
-
-        # Calculate end time
-        end_time = onset_time + datetime.timedelta(seconds=duration_sec)
-
-        arousals.append({
-            'onset_time': onset_time,
-            'end_time': end_time,
-            'duration': duration_sec,
-            'type': event_type
-        })
-
-    return arousals
-
-
-def extract_flow_events(df, edf_start_time):
-    """Extract respiratory/flow events from Excel."""
-    flow_rows = df[df[3].astype(str).str.contains('Respiratory Event|Desaturation', case=False, na=False)]
-
-    events = []
-
-    for _, row in flow_rows.iterrows():
-        timestamp_str = str(row[2])
-        event_text = str(row[3])
-
-        onset_time = parse_timestamp(timestamp_str, edf_start_time)
-
-        # Extract duration
-        duration_sec = 0.0
-        if 'Dur:' in event_text:
-            try:
-                dur_part = event_text.split('Dur:')[1].split('sec.')[0].strip()
-                duration_sec = float(dur_part)
-            except (IndexError, ValueError):
-                pass
-
-        end_time = onset_time + datetime.timedelta(seconds=duration_sec)
-
-        # Extract event type
-        event_type = "Flow Event"
-        if 'Hyp' in event_text:
-            event_type = "Hypopnea"
-        elif 'Apnea' in event_text:
-            event_type = "Apnea"
-        elif 'Desaturation' in event_text or 'Desat' in event_text:
-            event_type = "Desaturation"
-
-        events.append({
-            'onset_time': onset_time,
-            'end_time': end_time,
-            'duration': duration_sec,
-            'type': event_type
-        })
-
-    return events
-
-
-def parse_timestamp(timestamp_str, edf_start_time):
+        onset_us = parse_timestamp(timestamp_str, start_us)
+
+        if is_stage:
+            # Extract stage name
+            stage_name = event_text.replace('Stage -', '').strip()
+
+            stages.append({
+                'onset_us': onset_us,
+                'stage': stage_name
+            })
+
+        if is_arousal or is_flow:
+            # Extract duration from text: "Arousal - Dur: 19.6 sec. - Type"
+            duration_sec = parse_duration(event_text)
+            end_us = onset_us + round(duration_sec * US_PER_SECOND)
+
+        if is_arousal:
+            # Extract type (last part after final dash)
+            event_type = "Arousal"
+            if event_text.count(' - ') >= 2:
+                event_type = event_text.rpartition(' - ')[2].strip()
+
+            arousals.append({
+                'onset_us': onset_us,
+                'end_us': end_us,
+                'duration': duration_sec,
+                'type': event_type
+            })
+
+        if is_flow:
+            # Extract event type
+            event_type = "Flow Event"
+            if 'Hyp' in event_text:
+                event_type = "Hypopnea"
+            elif 'Apnea' in event_text:
+                event_type = "Apnea"
+            elif 'Desat' in event_text:
+                event_type = "Desaturation"
+
+            flow_events.append({
+                'onset_us': onset_us,
+                'end_us': end_us,
+                'duration': duration_sec,
+                'type': event_type
+            })
+
+    return stages, arousals, flow_events
+
+
+def parse_duration(event_text):
+    """Return the 'Dur: X sec.' value of an event description, or 0.0."""
+    match = DURATION_PATTERN.search(event_text)
+    if match:
+        try:
+            return float(match.group(1))
+        except ValueError:
+            pass
+    return 0.0
+
+
+def parse_timestamp(timestamp_str, default):
     """
-    Parse timestamp string from Excel and convert to datetime.
+    Parse timestamp string from Excel into microseconds since midnight.
 
-    Excel format: HH:MM:SS.ff (centiseconds)
+    Excel format: HH:MM:SS.ff (centiseconds). default is returned if the
+    string cannot be parsed.
     """
     try:
-        # Split time components
-        parts = timestamp_str.split(':')
-        hour = int(parts[0])
-        minute = int(parts[1])
-
-        # Handle seconds and centiseconds
-        sec_parts = parts[2].split('.')
-        second = int(sec_parts[0])
-        centisecond = 0
-
-        if len(sec_parts) > 1:
-            # Convert centiseconds to microseconds
-            cs_str = sec_parts[1][:2]  # Take only first 2 digits
-            centisecond = int(cs_str)
+        n = len(timestamp_str)
+        if (n >= 8 and timestamp_str[2] == ':' and timestamp_str[5] == ':'
+                and (n == 8 or timestamp_str[8] == '.')):
+            # Canonical HH:MM:SS[.ff...]: read the fields by position
+            hour = int(timestamp_str[0:2])
+            minute = int(timestamp_str[3:5])
+            second = int(timestamp_str[6:8])
+            centisecond = int(timestamp_str[9:11]) if n > 8 else 0  # Take only first 2 digits
+        else:
+            # Split time components
+            parts = timestamp_str.split(':')
+            hour = int(parts[0])
+            minute = int(parts[1])
+
+            # Handle seconds and centiseconds
+            sec_parts = parts[2].split('.')
+            second = int(sec_parts[0])
+            centisecond = 0
+
+            if len(sec_parts) > 1:
+                # Convert centiseconds to microseconds
+                cs_str = sec_parts[1][:2]  # Take only first 2 digits
+                centisecond = int(cs_str)
+
+        if not (0 <= hour < 24 and 0 <= minute < 60 and 0 <= second < 60 and 0 <= centisecond < 100):
+            raise ValueError("time of day out of range")
 
         microsecond = centisecond * 10000  # Convert centiseconds to microseconds
 
-        # Combine with EDF start date
-        timestamp = datetime.datetime(
-            edf_start_time.year,
-            edf_start_time.month,
-            edf_start_time.day,
-            hour, minute, second, microsecond
-        )
-
-        return timestamp
+        return (hour * 3600 + minute * 60 + second) * US_PER_SECOND + microsecond
 
     except Exception as e:
         print(f"Warning: Failed to parse timestamp '{timestamp_str}': {e}")
-        return edf_start_time
+        return default
 
 
 def write_sleep_profile(output_dir, base_filename, start_time, stages):
     """Write sleep profile file."""
     filename = output_dir / f"{base_filename} Sleep profile.txt"
 
+    # Header
+    lines = [
+        f"Start Time: {start_time.strftime('%d.%m.%Y %H:%M:%S')}\n",
+        "Version: 1.0\n\n",
+    ]
+
+    # Stages
+    for stage in stages:
+        stage_name = stage['stage']
+        if stage_name in SKIPPED_STAGES:
+            continue  # Skip "No Stage" entries
+
+        # Format: HH:MM:SS,ffffff; STAGE
+        time_str = format_time_of_day(stage['onset_us'])
+        # Normalize stage names ("R" → "REM"); unknown names pass through
+        lines.append(f"{time_str}; {STAGE_NAME_MAP.get(stage_name, stage_name)}\n")
+
     with open(filename, 'w', encoding='utf-8') as f:
-        # Write header
-        f.write(f"Start Time: {start_time.strftime('%d.%m.%Y %H:%M:%S')}\n")
-        f.write("Version: 1.0\n\n")
-
-        # Write stages
-        for stage in stages:
-            # Format: HH:MM:SS,ffffff; STAGE
-            time_str = stage['onset_time'].strftime('%H:%M:%S,%f')
-            stage_name = stage['stage']
-
-            # Normalize stage names
-            if stage_name in ['No Stage', 'NoStage']:
-                continue  # Skip "No Stage" entries
-            elif stage_name == 'W':
-                stage_name = 'W'
-            elif stage_name in ['N1', 'N2', 'N3']:
-                stage_name = stage_name
-            elif stage_name in ['R', 'REM']:
-                stage_name = 'REM'  # Convert "R" to "REM"
-
-            f.write(f"{time_str}; {stage_name}\n")
+        f.write(''.join(lines))
 
     print(f"  ✓ Sleep Profile: {len(stages)} stages → {filename.name}")
     return filename
@@ -300,22 +304,17 @@ def write_arousals(output_dir, base_filename, start_time, arousals):
     """Write arousals file."""
     filename = output_dir / f"{base_filename} Classification Arousals.txt"
 
+    # Header (matching RBDtector format)
+    lines = [
+        "Signal ID: Arousals\n",
+        f"Start Time: {start_time.strftime('%d.%m.%Y %H:%M:%S')}\n",
+        "Unit: s\n",
+        "Signal Type: Impuls\n\n",
+    ]
+    lines.extend(format_interval_lines(arousals))
+
     with open(filename, 'w', encoding='utf-8') as f:
-        # Write header (matching RBDtector format)
-        f.write("Signal ID: Arousals\n")
-        f.write(f"Start Time: {start_time.strftime('%d.%m.%Y %H:%M:%S')}\n")
-        f.write("Unit: s\n")
-        f.write("Signal Type: Impuls\n\n")
-
-        # Write events
-        for arousal in arousals:
-            # Format: HH:MM:SS,ffffff-HH:MM:SS,ffffff; DURATION; TYPE
-            onset_str = arousal['onset_time'].strftime('%H:%M:%S,%f')
-            end_str = arousal['end_time'].strftime('%H:%M:%S,%f')
-            duration = arousal['duration']
-            event_type = arousal['type']
-
-            f.write(f"{onset_str}-{end_str}; {duration:.2f}; {event_type}\n")
+        f.write(''.join(lines))
 
     print(f"  ✓ Arousals: {len(arousals)} events → {filename.name}")
     return filename
@@ -325,26 +324,39 @@ def write_flow_events(output_dir, base_filename, start_time, events):
     """Write flow events file."""
     filename = output_dir / f"{base_filename} Flow Events.txt"
 
-    with open(filename, 'w', encoding='utf-8') as f:
-        # Write header
-        f.write("Signal ID: Flow Events\n")
-        f.write(f"Start Time: {start_time.strftime('%d.%m.%Y %H:%M:%S')}\n")
-        f.write("Unit: s\n")
-        f.write("Signal Type: Impuls\n\n")
-
-        # Write events
-        for event in events:
-            onset_str = event['onset_time'].strftime('%H:%M:%S,%f')
-            end_str = event['end_time'].strftime('%H:%M:%S,%f')
-            duration = event['duration']
-            event_type = event['type']
+    # Header
+    lines = [
+        "Signal ID: Flow Events\n",
+        f"Start Time: {start_time.strftime('%d.%m.%Y %H:%M:%S')}\n",
+        "Unit: s\n",
+        "Signal Type: Impuls\n\n",
+    ]
+    lines.extend(format_interval_lines(events))
 
-            f.write(f"{onset_str}-{end_str}; {duration:.2f}; {event_type}\n")
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write(''.join(lines))
 
     print(f"  ✓ Flow Events: {len(events)} events → {filename.name}")
     return filename
 
 
+def format_time_of_day(us):
+    """Format microseconds since midnight as 'HH:MM:SS,ffffff', wrapping past midnight."""
+    seconds, us = divmod(us % US_PER_DAY, US_PER_SECOND)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d},{us:06d}"
+
+
+def format_interval_lines(events):
+    """Format events as 'HH:MM:SS,ffffff-HH:MM:SS,ffffff; DURATION; TYPE' lines."""
+    return [
+        f"{format_time_of_day(event['onset_us'])}-{format_time_of_day(event['end_us'])}; "
+        f"{event['duration']:.2f}; {event['type']}\n"
+        for event in events
+    ]
+
+
 def main():
     """Command line interface."""
     if len(sys.argv) < 2:
@@ -369,6 +381,10 @@ def main():
         print(f"Excel file: Auto-detect")
     print()
 
+    if not HAVE_LXML:
+        print("Warning: lxml is not installed; Excel parsing will be slower (pip install lxml)")
+        print()
+
     result = convert_excel_annotations(edf_path, excel_path)
 
     if result['success']:
@@ -14,12 +14,43 @@ Usage:
     python convert_standard_to_edfplus.py <INPUT_EDF> [OUTPUT_EDF]
 """
 
+import os
+import re
 import sys
+from concurrent.futures import ThreadPoolExecutor
 import mne
 import numpy as np
 from pathlib import Path
 import pyedflib
 
+# Channels whose names contain one of these are biosignals stored in V by MNE
+BIOSIGNAL_KEYWORDS = ('EMG', 'EEG', 'EOG', 'Chin', 'Lat', 'Rat')
+BIOSIGNAL_PATTERN = re.compile('|'.join(BIOSIGNAL_KEYWORDS))
+# Subset reported as EMG when verifying the output
+EMG_LABEL_PATTERN = re.compile('EMG|Chin|Lat|Rat')
+
+
+def _scale_and_max_abs(data, bio_mask):
+    """
+    Scale biosignal rows of data to µV in place and return each row's max |value|.
+
+    Each channel is scaled and reduced in one visit while its row is still in
+    cache. NumPy releases the GIL for these operations, so channels are
+    spread over a thread pool.
+    """
+    abs_max_per_ch = np.empty(data.shape[0], dtype=np.float64)
+
+    def process(i):
+        row = data[i]
+        if bio_mask[i]:
+            row *= 1e6  # V → µV
+        abs_max_per_ch[i] = np.maximum(np.abs(row.min()), np.abs(row.max()))
+
+    with ThreadPoolExecutor(max_workers=min(os.cpu_count() or 1, data.shape[0])) as executor:
+        list(executor.map(process, range(data.shape[0])))
+
+    return abs_max_per_ch
+
 
 def convert_standard_to_edfplus(input_edf, output_edf=None):
     """
@@ -70,7 +101,7 @@ def convert_standard_to_edfplus(input_edf, output_edf=None):
         print()
 
         # Check EMG channels
-        emg_channels = [ch for ch in raw.ch_names if any(kw in ch for kw in ['EMG', 'Chin', 'Lat', 'Rat', 'EEG', 'EOG'])]
+        emg_channels = [ch for ch in raw.ch_names if BIOSIGNAL_PATTERN.search(ch)]
         print(f"  EMG/EEG channels found: {len(emg_channels)}")
         for ch in emg_channels:
             print(f"    - {ch}")
@@ -78,38 +109,44 @@ def convert_standard_to_edfplus(input_edf, output_edf=None):
 
         # Step 2: Convert to microvolts
         print("Step 2: Converting units to µV...")
-        data = raw.get_data()
+        # With preload=True the samples already live in raw._data; get_data()
+        # would return a second full-recording copy. Scaling below therefore
+        # modifies raw's buffer in place, which is fine: raw is only used for
+        # metadata from here on.
+        data = raw._data
         ch_names = raw.ch_names
         sfreq = raw.info['sfreq']
 
         # Convert EMG/EEG/EOG channels to µV
-        channels_converted = []
-        for i, ch_name in enumerate(ch_names):
-            # Identify channel type from name
-            ch_type = None
-            for keyword in ['EMG', 'EEG', 'EOG', 'Chin', 'Lat', 'Rat']:
-                if keyword in ch_name:
-                    ch_type = 'biosignal'
-                    break
-
-            if ch_type == 'biosignal':
-                data[i] = data[i] * 1e6  # V → µV
-                channels_converted.append(ch_name)
-
-        print(f"  ✓ Converted {len(channels_converted)} channels to µV")
+        # Identify channel type from name
+        bio_mask = np.array([BIOSIGNAL_PATTERN.search(ch_name) is not None for ch_name in ch_names], dtype=bool)
+        # Scale selected rows in place and collect per-channel max |value| for Step 3
+        abs_max_per_ch = _scale_and_max_abs(data, bio_mask)
+
+        print(f"  ✓ Converted {np.count_nonzero(bio_mask)} channels to µV")
         print()
 
         # Step 3: Prepare signal headers
         print("Step 3: Preparing pyedflib headers...")
         signal_headers = []
 
-        for i, ch_name in enumerate(ch_names):
-            ch_data = data[i]
+        # Calculate physical range using FULL data range (not percentile)
+        # Previous 99th percentile method caused clipping of large EMG bursts
+        # AASM recommends ±50 mV input range to prevent signal saturation
+        # (abs_max_per_ch was computed alongside the µV scaling in Step 2)
+
+        # Fields shared by every channel: 16-bit EDF digital range, common sfreq
+        header_template = {
+            'sample_frequency': int(sfreq),
+            'digital_min': -32768,
+            'digital_max': 32767,
+            'transducer': '',
+            'prefilter': ''
+        }
 
-            # Calculate physical range using FULL data range (not percentile)
-            # Previous 99th percentile method caused clipping of large EMG bursts
-            # AASM recommends ±50 mV input range to prevent signal saturation
-            abs_max = max(abs(ch_data.min()), abs(ch_data.max()))
+        for i, ch_name in enumerate(ch_names):
+            abs_max = abs_max_per_ch[i]
+            is_bio = bio_mask[i]  # EMG/EEG/EOG channel, already converted to µV
 
             # Add 100% margin to accommodate signal variations during sleep
             # This ensures no clipping of phasic/tonic EMG bursts
@@ -117,29 +154,21 @@ def convert_standard_to_edfplus(input_edf, output_edf=None):
             physical_min = -physical_max
 
             # Ensure minimum range of ±500 µV for EMG channels (AASM guidelines)
-            if ch_name in channels_converted:  # EMG/EEG/EOG channels
+            if is_bio:  # EMG/EEG/EOG channels
                 min_range = 500.0  # µV
                 if abs(physical_max) < min_range:
                     physical_max = min_range
                     physical_min = -min_range
 
-            # Digital range (16-bit EDF)
-            digital_min = -32768
-            digital_max = 32767
-
             # Set dimension based on channel type
-            dimension = 'uV' if ch_name in channels_converted else ''
+            dimension = 'uV' if is_bio else ''
 
             header = {
+                **header_template,
                 'label': ch_name,
                 'dimension': dimension,
-                'sample_frequency': int(sfreq),
                 'physical_min': physical_min,
-                'physical_max': physical_max,
-                'digital_min': digital_min,
-                'digital_max': digital_max,
-                'transducer': '',
-                'prefilter': ''
+                'physical_max': physical_max
             }
             signal_headers.append(header)
 
@@ -163,21 +192,23 @@ def convert_standard_to_edfplus(input_edf, output_edf=None):
         samples_per_record = int(sfreq * record_duration)
         n_records = int(np.ceil(data.shape[1] / samples_per_record))
 
+        # All channels share sfreq, so a C-ordered (channels, samples) block
+        # is exactly one data record; every record is copied into this one buffer
+        record_buf = np.empty((len(ch_names), samples_per_record), dtype=np.float64)
+
         print(f"  Writing {n_records} data records...")
         for record_idx in range(n_records):
             start_sample = record_idx * samples_per_record
             end_sample = min((record_idx + 1) * samples_per_record, data.shape[1])
+            n_samples = end_sample - start_sample
 
-            # Write this record for all channels
-            for ch_idx in range(len(ch_names)):
-                record_data = data[ch_idx, start_sample:end_sample]
+            record_buf[:, :n_samples] = data[:, start_sample:end_sample]
 
-                # Pad last record if needed
-                if len(record_data) < samples_per_record and record_idx == n_records - 1:
-                    pad_length = samples_per_record - len(record_data)
-                    record_data = np.pad(record_data, (0, pad_length), mode='edge')
+            # Pad last record if needed (repeat each channel's final sample)
+            if n_samples < samples_per_record:
+                record_buf[:, n_samples:] = record_buf[:, n_samples - 1:n_samples]
 
-                f.writePhysicalSamples(record_data)
+            f.blockWritePhysicalSamples(record_buf.ravel())
 
             if (record_idx + 1) % 1000 == 0:
                 print(f"    Progress: {record_idx + 1}/{n_records} records")
@@ -202,7 +233,7 @@ def convert_standard_to_edfplus(input_edf, output_edf=None):
 
             # Check EMG channels
             labels = [f_verify.getLabel(i) for i in range(f_verify.signals_in_file)]
-            emg_labels = [l for l in labels if any(kw in l for kw in ['EMG', 'Chin', 'Lat', 'Rat'])]
+            emg_labels = [l for l in labels if EMG_LABEL_PATTERN.search(l)]
             print("  EMG channels in converted file:")
             for label in emg_labels:
                 idx = labels.index(label)
@@ -10,11 +10,20 @@ Date: 2025-11-20
 """
 
 import os
+import re
 import sys
+import json
 from pathlib import Path
 
+# Detection results are cached in a sidecar file next to each EDF
+CACHE_SUFFIX = '.edfmeta.json'
 
-def detect_edf_format(edf_path):
+# Labels containing EMG, CHIN, LEG, Chin, Lat or Rat are treated as EMG channels
+EMG_LABEL_PATTERN = re.compile('EMG|CHIN|LEG|Chin|Lat|Rat')
+
+
+def detect_edf_format(edf_path, use_cache=True, include_annotations=True,
+                      include_channels=True):
     """
     Detect EDF file format and return characteristics.
 
@@ -22,16 +31,28 @@ def detect_edf_format(edf_path):
     -----------
     edf_path : str or Path
         Path to EDF file
+    use_cache : bool
+        Reuse the detection stored in the '<file>.edfmeta.json' sidecar when
+        the EDF's size and modification time are unchanged, and write the
+        sidecar after a fresh detection
+    include_annotations : bool
+        Open the file with pyedflib to count annotations and check that it is
+        readable. If False, only the fixed header is read: the type comes from
+        the reserved field, and has_annotations / pyedflib_compatible are
+        None (not checked)
+    include_channels : bool
+        Collect signal labels to find EMG channels. If False, emg_channels is
+        None (not checked); use this when only the type is needed for routing
 
     Returns:
     --------
     dict with keys:
         - type: 'EDF+C' | 'EDF+D' | 'Standard' | 'Invalid'
-        - has_annotations: bool
-        - pyedflib_compatible: bool
+        - has_annotations: bool (None if not checked)
+        - pyedflib_compatible: bool (None if not checked)
         - excel_file: str or None (path to accompanying Excel file)
         - num_signals: int or None
-        - emg_channels: list of (index, name) tuples
+        - emg_channels: list of (index, name) tuples (None if not checked)
         - error: str or None (error message if detection failed)
     """
     edf_path = Path(edf_path)
@@ -47,6 +68,127 @@ def detect_edf_format(edf_path):
             'error': f"File not found: {edf_path}"
         }
 
+    stat = edf_path.stat()
+    result = _load_cached_result(edf_path, stat) if use_cache else None
+
+    if result is None:
+        if include_annotations:
+            result = _detect_header(edf_path, include_channels)
+            # Only complete results are cached
+            if use_cache and include_channels and result['error'] is None:
+                _save_cached_result(edf_path, stat, result)
+        else:
+            # Header-only results are not cached: they lack the pyedflib checks
+            result = _detect_header_only(edf_path, include_channels)
+
+    # Check for accompanying Excel file
+    excel_patterns = [
+        edf_path.with_suffix('.xlsx'),
+        edf_path.with_suffix('.XLSX'),
+    ]
+
+    for excel_path in excel_patterns:
+        if excel_path.exists():
+            result['excel_file'] = str(excel_path)
+            break
+
+    return result
+
+
+def _cache_path(edf_path):
+    return edf_path.with_name(edf_path.name + CACHE_SUFFIX)
+
+
+def _load_cached_result(edf_path, stat):
+    """Return the cached detection result, or None if missing or stale."""
+    try:
+        with open(_cache_path(edf_path), 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if cached.get('size') != stat.st_size or cached.get('mtime_ns') != stat.st_mtime_ns:
+        return None
+
+    result = cached['result']
+    result['emg_channels'] = [tuple(ch) for ch in result['emg_channels']]
+    return result
+
+
+def _save_cached_result(edf_path, stat, result):
+    """Write the detection result to the sidecar file (best effort)."""
+    cached = {
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'result': result
+    }
+    try:
+        with open(_cache_path(edf_path), 'w', encoding='utf-8') as f:
+            json.dump(cached, f)
+    except OSError:
+        pass
+
+
+def _read_header_labels(edf_path):
+    """Return (reserved field, signal labels) read directly from the EDF header."""
+    with open(edf_path, 'rb') as f:
+        header = f.read(256)
+
+        reserved = header[192:236].decode('ascii', errors='ignore').strip()
+
+        # Read basic info from header
+        num_signals_str = header[252:256].decode('ascii', errors='ignore').strip()
+        if not num_signals_str.isdigit():
+            return reserved, None
+
+        # Read signal labels
+        num_signals = int(num_signals_str)
+        label_bytes = f.read(16 * num_signals)
+
+    labels = [label_bytes[i*16:(i+1)*16].decode('ascii', errors='ignore').strip()
+              for i in range(num_signals)]
+    return reserved, labels
+
+
+def _detect_header_only(edf_path, include_channels=True):
+    """Detect type and EMG channels from the fixed header alone (no pyedflib)."""
+    result = {
+        'type': 'Standard',
+        'has_annotations': None,
+        'pyedflib_compatible': None,
+        'excel_file': None,
+        'num_signals': None,
+        'emg_channels': [],
+        'error': None
+    }
+
+    try:
+        reserved, labels = _read_header_labels(edf_path)
+    except Exception as e:
+        result['error'] = f"header read error: {str(e)}"
+        return result
+
+    if reserved.startswith('EDF+C'):
+        result['type'] = 'EDF+C'
+    elif reserved.startswith('EDF+D'):
+        result['type'] = 'EDF+D'
+
+    if labels is not None:
+        # Match pyedflib: annotation signals are not counted or indexed
+        labels = [label for label in labels if label != 'EDF Annotations']
+        result['num_signals'] = len(labels)
+        result['emg_channels'] = _find_emg_channels(labels) if include_channels else None
+
+    return result
+
+
+def _find_emg_channels(labels):
+    """Return (index, label) for every label matching EMG_LABEL_PATTERN."""
+    return [(i, label) for i, label in enumerate(labels) if EMG_LABEL_PATTERN.search(label)]
+
+
+def _detect_header(edf_path, include_channels=True):
+    """Read the EDF header and detect type, annotations and EMG channels."""
     result = {
         'type': 'Unknown',
         'has_annotations': False,
@@ -80,15 +222,11 @@ def detect_edf_format(edf_path):
         num_annotations = f.annotations_in_file
         result['has_annotations'] = num_annotations > 0
 
-        # Detect EMG channels
-        emg_channels = []
-        for i in range(f.signals_in_file):
-            label = f.getLabel(i)
-            # Look for EMG, CHIN, LEG, Chin, Lat, Rat
-            if any(keyword in label for keyword in ['EMG', 'CHIN', 'LEG', 'Chin', 'Lat', 'Rat']):
-                emg_channels.append((i, label))
-
-        result['emg_channels'] = emg_channels
+        # Detect EMG channels (labels are only fetched when asked for)
+        if include_channels:
+            result['emg_channels'] = _find_emg_channels(f.getSignalLabels())
+        else:
+            result['emg_channels'] = None
 
         f.close()
 
@@ -99,41 +237,21 @@ def detect_edf_format(edf_path):
 
         # Try manual header reading
         try:
-            with open(edf_path, 'rb') as f:
-                header = f.read(256)
-
-                # Read basic info from header
-                num_signals_str = header[252:256].decode('ascii', errors='ignore').strip()
-                if num_signals_str.isdigit():
-                    result['num_signals'] = int(num_signals_str)
-
-                # Read signal labels
-                if result['num_signals']:
-                    label_bytes = f.read(16 * result['num_signals'])
-                    emg_channels = []
-
-                    for i in range(result['num_signals']):
-                        label = label_bytes[i*16:(i+1)*16].decode('ascii', errors='ignore').strip()
-                        if any(keyword in label for keyword in ['EMG', 'CHIN', 'LEG', 'Chin', 'Lat', 'Rat']):
-                            emg_channels.append((i, label))
-
-                    result['emg_channels'] = emg_channels
+            _, labels = _read_header_labels(edf_path)
+            if labels is not None:
+                result['num_signals'] = len(labels)
+            result['emg_channels'] = _find_emg_channels(labels or []) if include_channels else None
 
         except Exception as header_error:
             result['error'] = f"pyedflib error: {str(e)}, header read error: {str(header_error)}"
 
-    # Check for accompanying Excel file
-    excel_patterns = [
-        edf_path.with_suffix('.xlsx'),
-        edf_path.with_suffix('.XLSX'),
-    ]
+    return result
 
-    for excel_path in excel_patterns:
-        if excel_path.exists():
-            result['excel_file'] = str(excel_path)
-            break
 
-    return result
+def _yes_no(flag):
+    if flag is None:
+        return '- Not checked (header only)'
+    return '✓ Yes' if flag else '✗ No'
 
 
 def print_detection_result(result):
@@ -143,8 +261,8 @@ def print_detection_result(result):
     print("="*60)
 
     print(f"Type: {result['type']}")
-    print(f"pyedflib compatible: {'✓ Yes' if result['pyedflib_compatible'] else '✗ No'}")
-    print(f"Has annotations: {'✓ Yes' if result['has_annotations'] else '✗ No'}")
+    print(f"pyedflib compatible: {_yes_no(result['pyedflib_compatible'])}")
+    print(f"Has annotations: {_yes_no(result['has_annotations'])}")
 
     if result['excel_file']:
         print(f"Excel file: ✓ Found ({Path(result['excel_file']).name})")
@@ -154,7 +272,9 @@ def print_detection_result(result):
     if result['num_signals']:
         print(f"Number of signals: {result['num_signals']}")
 
-    if result['emg_channels']:
+    if result['emg_channels'] is None:
+        print("EMG channels: - Not checked")
+    elif result['emg_channels']:
         print(f"EMG channels found: {len(result['emg_channels'])}")
         for idx, name in result['emg_channels']:
             print(f"  [{idx}] {name}")
@@ -168,6 +288,8 @@ def print_detection_result(result):
     print("Recommended converter:")
     if result['type'] == 'EDF+C' and result['has_annotations']:
         print("  → convert_edf_annotations.py (annotations embedded)")
+    elif result['type'] == 'EDF+C' and result['has_annotations'] is None:
+        print("  → convert_edf_annotations.py (if annotations are embedded; not checked)")
     elif result['type'] == 'EDF+D':
         print("  → convert_test8_to_continuous.py (discontinuous → continuous)")
         print("  → then convert_edf_annotations.py")
@@ -184,15 +306,17 @@ def print_detection_result(result):
 def main():
     """Command line interface for detection utility."""
     if len(sys.argv) < 2:
-        print("Usage: python detect_edf_format.py <EDF_FILE>")
+        print("Usage: python detect_edf_format.py <EDF_FILE> [--header-only]")
         print()
         print("Example:")
         print("  python detect_edf_format.py Clinical_DB/Test1.EDF")
         print("  python detect_edf_format.py Clinical_DB/additional/PS0140_211029.EDF")
+        print("  python detect_edf_format.py Clinical_DB/Test1.EDF --header-only")
         sys.exit(1)
 
     edf_path = sys.argv[1]
-    result = detect_edf_format(edf_path)
+    include_annotations = '--header-only' not in sys.argv[2:]
+    result = detect_edf_format(edf_path, include_annotations=include_annotations)
     print_detection_result(result)
 
     # Exit code based on result
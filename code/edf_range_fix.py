@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Shared EDF read/analyse/write pipeline for the physical-range fix scripts.
+
+fix_physical_range.py and fix_physical_ranges.py apply different range rules
+and print different reports, but read, analyse and rewrite the file the same
+way. That common work lives here:
+
+  - read_signal_headers: per-channel header dicts of an open EdfReader
+  - analyze_channels: read channels one by one and analyse them on worker threads
+  - min_max: single-pass (min, max) of a signal
+  - digital_to_physical: map stored digital values through a channel's scaling
+  - write_records: stream all samples from the reader into the writer in
+    1-second data records, edge-padding the last one
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
+
+# Records read from the input per block while writing (bounds memory use)
+RECORDS_PER_BLOCK = 1000
+
+# Samples per cache-sized block in min_max (1 MiB of float64)
+MIN_MAX_BLOCK = 1 << 17
+
+# Worker threads analysing channels while the next one is read
+ANALYSIS_WORKERS = min(8, os.cpu_count() or 1)
+
+
+def read_signal_headers(f_in):
+    """Return the signal header dict of every channel of an open EdfReader."""
+    return [
+        {
+            'label': f_in.getLabel(i),
+            'dimension': f_in.getPhysicalDimension(i),
+            'sample_frequency': int(f_in.getSampleFrequency(i)),
+            'physical_min': f_in.getPhysicalMinimum(i),
+            'physical_max': f_in.getPhysicalMaximum(i),
+            'digital_min': f_in.getDigitalMinimum(i),
+            'digital_max': f_in.getDigitalMaximum(i),
+            'transducer': f_in.getTransducer(i),
+            'prefilter': f_in.getPrefilter(i)
+        }
+        for i in range(f_in.signals_in_file)
+    ]
+
+
+def min_max(data):
+    """
+    Return (min, max) of a 1-D signal in a single pass over memory.
+
+    Each block is reduced for both min and max while it is still in cache,
+    so a long channel is streamed from RAM once instead of twice.
+    """
+    n_blocks = -(-data.size // MIN_MAX_BLOCK)
+    block_mins = np.empty(n_blocks, dtype=data.dtype)
+    block_maxs = np.empty(n_blocks, dtype=data.dtype)
+    for k in range(n_blocks):
+        block = data[k * MIN_MAX_BLOCK:(k + 1) * MIN_MAX_BLOCK]
+        block_mins[k] = block.min()
+        block_maxs[k] = block.max()
+    return block_mins.min(), block_maxs.max()
+
+
+def digital_to_physical(header, digital_value):
+    """
+    Map digital sample value(s) to physical units with the header's scaling.
+
+    Uses edflib's own formula, so the result is bit-identical to the value
+    readSignal() returns for that sample.
+    """
+    bitvalue = ((header['physical_max'] - header['physical_min'])
+                / (header['digital_max'] - header['digital_min']))
+    offset = header['physical_max'] / bitvalue - header['digital_max']
+    return bitvalue * (offset + digital_value)
+
+
+def analyze_channels(f_in, channels, analyze, digital=False):
+    """
+    Return {channel: analyze(channel, samples)} for the given channel indices.
+
+    With digital=True the stored integer samples are analysed (int32, half the
+    size of physical float64 and no per-sample scaling on read).
+
+    Channels are read on the calling thread, one after another (edflib will
+    not open the same file twice), and analysed on worker threads: NumPy
+    reductions release the GIL, so reading overlaps the analysis. At most
+    ANALYSIS_WORKERS + 1 channels are held in memory at a time.
+    """
+    futures = {}
+    with ThreadPoolExecutor(max_workers=ANALYSIS_WORKERS) as executor:
+        for i in channels:
+            futures[i] = executor.submit(analyze, i, f_in.readSignal(i, digital=digital))
+
+            in_flight = [future for future in futures.values() if not future.done()]
+            if len(in_flight) > ANALYSIS_WORKERS:
+                wait(in_flight, return_when=FIRST_COMPLETED)
+
+    return {i: future.result() for i, future in futures.items()}
+
+
+def write_records(f_in, f_out, samples_per_record, progress=False):
+    """
+    Copy every sample of f_in into f_out as data records.
+
+    samples_per_record lists each output channel's samples per record (its
+    sample frequency for 1-second records). A block of records is laid out
+    as (record, samples of all channels) so that each record is one
+    contiguous buffer for blockWritePhysicalSamples, which writes exactly
+    one data record per call (edflib has no multi-record write, so a
+    (channels, samples) array cannot be handed over in one call); only one
+    block is held in memory. The last record is padded with each channel's final sample.
+    Returns the number of records written.
+    """
+    n_channels = len(samples_per_record)
+    n_samples = f_in.getNSamples()
+    n_records = int(np.ceil(n_samples[0] / samples_per_record[0]))
+    offsets = np.concatenate(([0], np.cumsum(samples_per_record)))
+
+    block_len = min(RECORDS_PER_BLOCK, n_records)
+    records = np.empty((block_len, offsets[-1]))
+
+    # One contiguous read buffer per channel, reused for every block (the
+    # low-level readsignal fills a caller-owned float64 array in place)
+    channel_bufs = [np.empty(block_len * spr) for spr in samples_per_record]
+
+    if progress:
+        print(f"  Writing {n_records} data records...")
+    for block_start in range(0, n_records, RECORDS_PER_BLOCK):
+        block_records = min(RECORDS_PER_BLOCK, n_records - block_start)
+
+        for ch_idx in range(n_channels):
+            spr = samples_per_record[ch_idx]
+            start_sample = block_start * spr
+            n_block_samples = min(block_records * spr, n_samples[ch_idx] - start_sample)
+            ch_block = channel_bufs[ch_idx][:block_records * spr]
+            f_in.readsignal(ch_idx, start_sample, n_block_samples, ch_block)
+
+            # Pad last record if needed
+            ch_block[n_block_samples:] = ch_block[n_block_samples - 1]
+
+            records[:block_records, offsets[ch_idx]:offsets[ch_idx + 1]] = ch_block.reshape(block_records, spr)
+
+        for record_idx in range(block_start, block_start + block_records):
+            f_out.blockWritePhysicalSamples(records[record_idx - block_start])
+
+            if progress and (record_idx + 1) % 1000 == 0:
+                print(f"    Progress: {record_idx + 1}/{n_records} records")
+
+    return n_records
@@ -3,57 +3,81 @@
 Extract COMPLETE RSWA data including Tonic, Phasic, Any from RBDtector Excel files
 """
 
+import os
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from itertools import zip_longest
 from pathlib import Path
-import glob
+from rbdtector_workbook import find_result_files, read_sheet_rows, write_records_csv
 
 BASE_DIR = Path("/Users/hyeongsuk/Desktop/workspace/SNUH/Atonia_Index")
 RESULTS_DIR = BASE_DIR / "Results"
 
 def extract_rbdtector_data(excel_file):
     """Extract all RSWA metrics from RBDtector Excel file"""
-    df = pd.read_excel(excel_file, sheet_name='Sheet1', header=None, engine='openpyxl')
+    rows = read_sheet_rows(excel_file, 4, sheet_name='Sheet1')
 
     # Row 1: Field names, Row 3: Data
-    field_names = df.iloc[1, :].tolist()
-    data_values = df.iloc[3, :].tolist()
-
-    # Create dict
-    data_dict = {}
-    for i, field in enumerate(field_names):
-        if pd.notna(field):
-            data_dict[field] = data_values[i]
-
-    return data_dict
+    field_names = rows[1]
+    data_values = rows[3]
+
+    # Create dict (empty data cells become NaN, as read_excel returned them)
+    nan = float('nan')
+    return {field: value if value is not None else nan
+            for field, value in zip_longest(field_names, data_values)
+            if field is not None}
+
+def load_test_result(test_num):
+    """
+    Find the newest RBDtector workbook of Test<test_num> and extract its data.
+
+    Returns (test_name, excel_file, data); excel_file and data are None when
+    the test has no workbook.
+    """
+    test_name = f"Test{test_num}"
+    # Find RBDtector Excel files - prefer "RBDtector output" over "RBDtector output_raw"
+    test_dir = RESULTS_DIR / "raw" / test_name
+    files = [entry.path for entry in find_result_files(test_dir / "RBDtector output")]
+    if not files:
+        # Fall back to the other RBDtector* output folders ("RBDtector output"
+        # was just scanned and had none)
+        try:
+            with os.scandir(test_dir) as it:
+                output_dirs = [entry.path for entry in it
+                               if entry.name.startswith('RBDtector') and entry.name != "RBDtector output"
+                               and entry.is_dir()]
+        except OSError:
+            output_dirs = []
+        files = [entry.path for output_dir in output_dirs
+                 for entry in find_result_files(output_dir)]
+
+    if not files:
+        return test_name, None, None
+
+    # Use most recent file (names carry a timestamp, so the last in sort order)
+    excel_file = max(files)
+    return test_name, excel_file, extract_rbdtector_data(excel_file)
 
 def main():
     print("="*80)
     print("Extracting COMPLETE RSWA Data from RBDtector Excel Files")
     print("="*80)
 
+    # Test1-10 workbooks are read concurrently (file reads and zip inflation
+    # overlap across threads); results come back in test order
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        results = list(executor.map(load_test_result, range(1, 11)))
+
     # Test1-10 data
     test_data = []
 
-    for test_num in range(1, 11):
-        test_name = f"Test{test_num}"
-        # Find RBDtector Excel files - prefer "RBDtector output" over "RBDtector output_raw"
-        pattern_main = str(RESULTS_DIR / f"raw/{test_name}/RBDtector output/RBDtector_results*.xlsx")
-        pattern_raw = str(RESULTS_DIR / f"raw/{test_name}/RBDtector*/RBDtector_results*.xlsx")
-
-        files = glob.glob(pattern_main)
-        if not files:
-            files = glob.glob(pattern_raw)
-
-        if not files:
+    for test_name, excel_file, data in results:
+        if excel_file is None:
             print(f"⚠ No RBDtector file for {test_name}")
             continue
 
-        # Use most recent file
-        excel_file = sorted(files)[-1]
         print(f"\n{test_name}: {Path(excel_file).name}")
 
-        data = extract_rbdtector_data(excel_file)
-
         # Extract CHIN metrics
         chin_tonic_pct = data.get('EMG CHIN1-CHINz_tonic_%', None)
         chin_phasic_pct = data.get('EMG CHIN1-CHINz_phasic_%', None)
@@ -72,9 +96,8 @@ def main():
         })
 
     # Save to CSV
-    df_test = pd.DataFrame(test_data)
     output_file = RESULTS_DIR / "Test1-10_RSWA_Complete.csv"
-    df_test.to_csv(output_file, index=False, encoding='utf-8-sig')
+    write_records_csv(output_file, test_data, encoding='utf-8-sig')
 
     print("\n" + "="*80)
     print(f"✓ Saved to: {output_file}")
@@ -82,7 +105,7 @@ def main():
 
     # Display summary
     print("\n### Test1-10 RSWA Summary ###")
-    print(df_test.to_string(index=False))
+    print(pd.DataFrame(test_data).to_string(index=False))
 
 if __name__ == "__main__":
     main()
@@ -4,54 +4,82 @@ Extract RBD indicators from converted Test1-10 files.
 """
 
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
+from rbdtector_workbook import find_result_files, read_sheet_rows, write_records_csv
 
 WORKSPACE = Path("/Users/hyeongsuk/Desktop/workspace/SNUH/Atonia_Index")
 results_dir = WORKSPACE / "Results" / "raw"
 
+def read_latest_result(test_name):
+    """
+    Read the first four rows of the newest result workbook of a test.
+
+    Returns (latest_file, latest_mtime, rows, error); latest_file is None when
+    there is no result file, and error holds the exception of a failed read.
+    """
+    test_dir = results_dir / test_name / "RBDtector output"
+
+    # Find latest result file (DirEntry.stat() is cached, so no extra stat calls)
+    result_files = find_result_files(test_dir, prefix='RBDtector_results_')
+    if not result_files:
+        return None, None, None, None
+
+    latest_entry = max(result_files, key=lambda entry: entry.stat().st_mtime)
+    latest_file = Path(latest_entry.path)
+    latest_mtime = latest_entry.stat().st_mtime
+
+    # Read Excel
+    try:
+        # Only the first four rows are needed
+        return latest_file, latest_mtime, read_sheet_rows(latest_file, 4), None
+    except Exception as e:
+        return latest_file, latest_mtime, None, e
+
+
 print("="*70)
 print("RBD Indicators from Converted Files (Test1-10)")
 print("="*70)
 print()
 
-data = []
+test_names = [f"Test{i}" for i in range(1, 11)]
 
-for i in range(1, 11):
-    test_name = f"Test{i}"
-    test_dir = results_dir / test_name / "RBDtector output"
+# Read the 10 workbooks concurrently (file reads and zip inflation overlap
+# across threads); results come back in test order
+with ThreadPoolExecutor(max_workers=len(test_names)) as executor:
+    results = list(executor.map(read_latest_result, test_names))
 
-    # Find latest result file
-    result_files = list(test_dir.glob("RBDtector_results_*.xlsx"))
-    if not result_files:
+data = []
+
+for test_name, (latest_file, latest_mtime, rows, error) in zip(test_names, results):
+    if latest_file is None:
         print(f"⚠️  {test_name}: No result file found")
         continue
 
-    latest_file = max(result_files, key=lambda x: x.stat().st_mtime)
+    if error is not None:
+        print(f"❌ {test_name}: Error - {error}")
+        continue
 
-    # Read Excel
     try:
-        df = pd.read_excel(latest_file, sheet_name=0, header=None)
-
         # Row 0: headers, Row 1: sub-headers, Row 3: data
-        chin_any_col = None
-        rleg_any_col = None
-        lleg_any_col = None
-
-        # Find columns (use Row 1 for sub-headers)
-        for col_idx in range(df.shape[1]):
-            subheader = str(df.iloc[1, col_idx])
-            if 'EMG CHIN1-CHINz_any_%' in subheader:
-                chin_any_col = col_idx
-            elif 'EMG RLEG+_any_%' in subheader:
-                rleg_any_col = col_idx
-            elif 'EMG LLEG+_any_%' in subheader:
-                lleg_any_col = col_idx
-
-        # Extract values
-        chin_any = df.iloc[3, chin_any_col] if chin_any_col is not None else None
-        rleg_any = df.iloc[3, rleg_any_col] if rleg_any_col is not None else None
-        lleg_any = df.iloc[3, lleg_any_col] if lleg_any_col is not None else None
+        # Find columns: map each Row 1 sub-header to its column once
+        col_map = {subheader: col_idx for col_idx, subheader in enumerate(rows[1])
+                   if isinstance(subheader, str)}
+        chin_any_col = col_map.get('EMG CHIN1-CHINz_any_%')
+        rleg_any_col = col_map.get('EMG RLEG+_any_%')
+        lleg_any_col = col_map.get('EMG LLEG+_any_%')
+
+        # Extract values (empty or missing data cells read as NaN)
+        def data_value(col_idx):
+            if col_idx is None:
+                return None
+            value = rows[3][col_idx] if col_idx < len(rows[3]) else None
+            return value if value is not None else float('nan')
+
+        chin_any = data_value(chin_any_col)
+        rleg_any = data_value(rleg_any_col)
+        lleg_any = data_value(lleg_any_col)
 
         data.append({
             'Test': test_name,
@@ -59,7 +87,7 @@ for i in range(1, 11):
             'RLEG_Any_%': rleg_any,
             'LLEG_Any_%': lleg_any,
             'File': latest_file.name,
-            'Modified': datetime.fromtimestamp(latest_file.stat().st_mtime).strftime('%Y-%m-%d %H:%M')
+            'Modified': datetime.fromtimestamp(latest_mtime).strftime('%Y-%m-%d %H:%M')
         })
 
         print(f"{test_name}: Chin={chin_any}% RLEG={rleg_any}% LLEG={lleg_any}% ({latest_file.name})")
@@ -78,6 +106,6 @@ print(result_df.to_string(index=False))
 
 # Save to CSV
 output_csv = WORKSPACE / "Results" / "Test1-10_RBD_Indicators_Converted.csv"
-result_df.to_csv(output_csv, index=False)
+write_records_csv(output_csv, data)
 print()
 print(f"✅ Saved to: {output_csv}")
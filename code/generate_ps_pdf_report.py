@@ -16,32 +16,87 @@ from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from datetime import datetime
 
-# Register Korean font
-try:
-    pdfmetrics.registerFont(TTFont('AppleGothic', '/System/Library/Fonts/AppleSDGothicNeo.ttc', subfontIndex=0))
-    KOREAN_FONT = 'AppleGothic'
-    print("✓ Korean font registered: AppleGothic")
-except:
-    try:
-        pdfmetrics.registerFont(TTFont('AppleGothic2', '/System/Library/Fonts/Supplemental/AppleGothic.ttf'))
-        KOREAN_FONT = 'AppleGothic2'
-        print("✓ Korean font registered: AppleGothic2")
-    except:
-        KOREAN_FONT = 'Helvetica'
-        print("⚠ No Korean font available - using Helvetica")
+# Korean font, registered with ReportLab on first use (parsing the TrueType
+# file is slow, and importing this module does not need it)
+_KOREAN_FONT = None
+
+def get_korean_font():
+    """Register the Korean font once and return its name (Helvetica if none is available)"""
+    global _KOREAN_FONT
+    if _KOREAN_FONT is None:
+        try:
+            pdfmetrics.registerFont(TTFont('AppleGothic', '/System/Library/Fonts/AppleSDGothicNeo.ttc', subfontIndex=0))
+            _KOREAN_FONT = 'AppleGothic'
+            print("✓ Korean font registered: AppleGothic")
+        except:
+            try:
+                pdfmetrics.registerFont(TTFont('AppleGothic2', '/System/Library/Fonts/Supplemental/AppleGothic.ttf'))
+                _KOREAN_FONT = 'AppleGothic2'
+                print("✓ Korean font registered: AppleGothic2")
+            except:
+                _KOREAN_FONT = 'Helvetica'
+                print("⚠ No Korean font available - using Helvetica")
+    return _KOREAN_FONT
 
 # Paths
 BASE_DIR = Path("/Users/hyeongsuk/Desktop/workspace/SNUH/Atonia_Index")
 RESULTS_DIR = BASE_DIR / "Results"
 OUTPUT_PDF = RESULTS_DIR / "PS0140-151_RBD_Analysis_Report_Test_Format.pdf"
 
+# Patient rows per Table in split_table (about one landscape page; even, so
+# the alternating row colours carry on across tables)
+ROWS_PER_TABLE = 24
+
 def load_data():
     """Load all PS0140-151 data"""
     complete_df = pd.read_csv(RESULTS_DIR / "PS0140-151_Complete_Analysis.csv", encoding='utf-8-sig')
     return complete_df
 
+def split_table(table_data, col_widths, table_style):
+    """
+    Return table_data (header row first) as consecutive Tables of at most
+    ROWS_PER_TABLE rows, each starting with the header row.
+
+    ReportLab lays out all remaining rows again each time one big table is
+    split over a page, so layout time grows with the square of the rows;
+    fixed-size tables keep it linear. table_style(is_first, is_last) returns
+    the style commands of a table.
+    """
+    header, rows = table_data[0], table_data[1:]
+    chunks = [rows[i:i + ROWS_PER_TABLE] for i in range(0, len(rows), ROWS_PER_TABLE)] or [[]]
+
+    tables = []
+    for k, chunk in enumerate(chunks):
+        table = Table([header] + chunk, colWidths=col_widths, repeatRows=1)
+        table.setStyle(TableStyle(table_style(k == 0, k == len(chunks) - 1)))
+        tables.append(table)
+    return tables
+
+
+def table_outline(is_first, is_last, width=1.5, color=colors.HexColor('#2c5aa0')):
+    """
+    Return the style commands drawing the outer border of one split_table
+    Table: the sides always, the top only on the first and the bottom only on
+    the last, so the border frames the Tables as one table.
+    """
+    commands = [
+        ('LINEBEFORE', (0, 0), (0, -1), width, color),
+        ('LINEAFTER', (-1, 0), (-1, -1), width, color),
+    ]
+    if is_first:
+        commands.append(('LINEABOVE', (0, 0), (-1, 0), width, color))
+    if is_last:
+        commands.append(('LINEBELOW', (0, -1), (-1, -1), width, color))
+    return commands
+
+
 def create_pdf_report(data_df):
     """Create PDF report in Test1-10 format"""
+    # Summary statistics of every column the report uses, computed once
+    stats = data_df[['REM_Duration_min', 'Artifact_free_%',
+                     'CHIN_Mean', 'CHIN_Std', 'LAT_Mean', 'LAT_Std', 'RAT_Mean', 'RAT_Std',
+                     'CHIN_Any_%', 'LAT_Any_%', 'RAT_Any_%']].agg(['mean', 'std', 'min', 'max'])
+
     doc = SimpleDocTemplate(
         str(OUTPUT_PDF),
         pagesize=landscape(A4),
@@ -56,6 +111,7 @@ def create_pdf_report(data_df):
 
     # Create styles
     styles = getSampleStyleSheet()
+    korean_font = get_korean_font()
 
     # Title style (with Korean support)
     title_style = ParagraphStyle(
@@ -65,7 +121,7 @@ def create_pdf_report(data_df):
         textColor=colors.HexColor('#1f4788'),
         spaceAfter=20,
         alignment=TA_CENTER,
-        fontName=KOREAN_FONT
+        fontName=korean_font
     )
 
     # Subtitle style
@@ -76,7 +132,7 @@ def create_pdf_report(data_df):
         textColor=colors.HexColor('#2c5aa0'),
         spaceAfter=12,
         spaceBefore=12,
-        fontName=KOREAN_FONT
+        fontName=korean_font
     )
 
     # Normal text style
@@ -84,7 +140,7 @@ def create_pdf_report(data_df):
         'CustomNormal',
         parent=styles['Normal'],
         fontSize=9,
-        fontName=KOREAN_FONT,
+        fontName=korean_font,
         leading=12
     )
 
@@ -119,67 +175,76 @@ def create_pdf_report(data_df):
          'RAT\nAny (%)']
     ]
 
-    for _, row in data_df.iterrows():
-        table_data.append([
-            row['Patient'],
-            f"{row['REM_Duration_min']:.1f}",
-            f"{row['Artifact_free_%']:.1f}",
-            row['CHIN_Baseline'],
-            row['LAT_Baseline'],
-            row['RAT_Baseline'],
-            f"{row['CHIN_Any_%']:.1f}",
-            f"{row['LAT_Any_%']:.1f}",
-            f"{row['RAT_Any_%']:.1f}"
-        ])
+    # Format whole columns at once and zip them into rows (iterrows would
+    # box every row into a Series)
+    def fmt1(column):
+        return data_df[column].map('{:.1f}'.format)
+
+    table_data.extend(map(list, zip(
+        data_df['Patient'],
+        fmt1('REM_Duration_min'),
+        fmt1('Artifact_free_%'),
+        data_df['CHIN_Baseline'],
+        data_df['LAT_Baseline'],
+        data_df['RAT_Baseline'],
+        fmt1('CHIN_Any_%'),
+        fmt1('LAT_Any_%'),
+        fmt1('RAT_Any_%')
+    )))
 
     # Add mean row
     table_data.append([
         'Mean ± SD',
-        f"{data_df['REM_Duration_min'].mean():.1f}±{data_df['REM_Duration_min'].std():.1f}",
-        f"{data_df['Artifact_free_%'].mean():.1f}±{data_df['Artifact_free_%'].std():.1f}",
-        f"{data_df['CHIN_Mean'].mean():.2f}±{data_df['CHIN_Std'].mean():.2f}",
-        f"{data_df['LAT_Mean'].mean():.2f}±{data_df['LAT_Std'].mean():.2f}",
-        f"{data_df['RAT_Mean'].mean():.2f}±{data_df['RAT_Std'].mean():.2f}",
-        f"{data_df['CHIN_Any_%'].mean():.1f}±{data_df['CHIN_Any_%'].std():.1f}",
-        f"{data_df['LAT_Any_%'].mean():.1f}±{data_df['LAT_Any_%'].std():.1f}",
-        f"{data_df['RAT_Any_%'].mean():.1f}±{data_df['RAT_Any_%'].std():.1f}"
+        f"{stats.at['mean', 'REM_Duration_min']:.1f}±{stats.at['std', 'REM_Duration_min']:.1f}",
+        f"{stats.at['mean', 'Artifact_free_%']:.1f}±{stats.at['std', 'Artifact_free_%']:.1f}",
+        f"{stats.at['mean', 'CHIN_Mean']:.2f}±{stats.at['mean', 'CHIN_Std']:.2f}",
+        f"{stats.at['mean', 'LAT_Mean']:.2f}±{stats.at['mean', 'LAT_Std']:.2f}",
+        f"{stats.at['mean', 'RAT_Mean']:.2f}±{stats.at['mean', 'RAT_Std']:.2f}",
+        f"{stats.at['mean', 'CHIN_Any_%']:.1f}±{stats.at['std', 'CHIN_Any_%']:.1f}",
+        f"{stats.at['mean', 'LAT_Any_%']:.1f}±{stats.at['std', 'LAT_Any_%']:.1f}",
+        f"{stats.at['mean', 'RAT_Any_%']:.1f}±{stats.at['std', 'RAT_Any_%']:.1f}"
     ])
 
-    # Create table
-    table = Table(table_data, colWidths=[1.5*cm, 1.8*cm, 1.8*cm, 2*cm, 2*cm, 2*cm, 1.8*cm, 1.8*cm, 1.8*cm])
-
-    # Table style
-    table.setStyle(TableStyle([
-        # Header row
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2c5aa0')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 9),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-
-        # Data rows
-        ('BACKGROUND', (0, 1), (-1, -2), colors.beige),
-        ('TEXTCOLOR', (0, 1), (-1, -2), colors.black),
-        ('ALIGN', (0, 1), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 8),
-        ('TOPPADDING', (0, 1), (-1, -1), 6),
-        ('BOTTOMPADDING', (0, 1), (-1, -1), 6),
-
-        # Mean row
-        ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#d9e2f3')),
-        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-
-        # Grid
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ('BOX', (0, 0), (-1, -1), 1.5, colors.HexColor('#2c5aa0')),
-
-        # Alternating row colors
-        ('ROWBACKGROUNDS', (0, 1), (-1, -2), [colors.white, colors.HexColor('#f2f2f2')]),
-    ]))
-
-    elements.append(table)
+    # Table style; every table starts with the header row, and the mean row
+    # is the last row of the last table
+    def summary_style(is_first, is_last):
+        last_data_row = -2 if is_last else -1
+        commands = [
+            # Header row
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2c5aa0')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 9),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+
+            # Data rows
+            ('BACKGROUND', (0, 1), (-1, last_data_row), colors.beige),
+            ('TEXTCOLOR', (0, 1), (-1, last_data_row), colors.black),
+            ('ALIGN', (0, 1), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (-1, -1), 8),
+            ('TOPPADDING', (0, 1), (-1, -1), 6),
+            ('BOTTOMPADDING', (0, 1), (-1, -1), 6),
+        ]
+        if is_last:
+            commands += [
+                # Mean row
+                ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#d9e2f3')),
+                ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+            ]
+        commands += [
+            # Grid
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+
+            # Alternating row colors
+            ('ROWBACKGROUNDS', (0, 1), (-1, last_data_row), [colors.white, colors.HexColor('#f2f2f2')]),
+        ]
+        return commands + table_outline(is_first, is_last)
+
+    # Create tables
+    elements.extend(split_table(table_data, [1.5*cm, 1.8*cm, 1.8*cm, 2*cm, 2*cm, 2*cm, 1.8*cm, 1.8*cm, 1.8*cm],
+                                summary_style))
     elements.append(Spacer(1, 0.7*cm))
 
     # Section 2: Detailed RSWA Metrics
@@ -194,47 +259,37 @@ def create_pdf_report(data_df):
          'RAT\nTonic (%)', 'RAT\nPhasic (%)', 'RAT\nAny (%)']
     ]
 
-    for _, row in data_df.iterrows():
-        rswa_data.append([
-            row['Patient'],
-            f"{row['CHIN_Tonic_%']:.1f}",
-            f"{row['CHIN_Phasic_%']:.1f}",
-            f"{row['CHIN_Any_%']:.1f}",
-            f"{row['LAT_Tonic_%']:.1f}",
-            f"{row['LAT_Phasic_%']:.1f}",
-            f"{row['LAT_Any_%']:.1f}",
-            f"{row['RAT_Tonic_%']:.1f}",
-            f"{row['RAT_Phasic_%']:.1f}",
-            f"{row['RAT_Any_%']:.1f}"
-        ])
-
-    rswa_table = Table(rswa_data, colWidths=[1.5*cm, 1.5*cm, 1.5*cm, 1.5*cm, 1.5*cm, 1.5*cm, 1.5*cm, 1.5*cm, 1.5*cm, 1.5*cm])
-
-    rswa_table.setStyle(TableStyle([
-        # Header
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2c5aa0')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 8),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-
-        # Data
-        ('ALIGN', (0, 1), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 8),
-        ('TOPPADDING', (0, 1), (-1, -1), 5),
-        ('BOTTOMPADDING', (0, 1), (-1, -1), 5),
-
-        # Grid
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ('BOX', (0, 0), (-1, -1), 1.5, colors.HexColor('#2c5aa0')),
-
-        # Alternating rows
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f2f2f2')]),
-    ]))
-
-    elements.append(rswa_table)
+    rswa_data.extend(map(list, zip(
+        data_df['Patient'],
+        *(fmt1(f'{channel}_{kind}_%') for channel in ('CHIN', 'LAT', 'RAT')
+          for kind in ('Tonic', 'Phasic', 'Any'))
+    )))
+
+    def rswa_style(is_first, is_last):
+        return [
+            # Header
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2c5aa0')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 8),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+
+            # Data
+            ('ALIGN', (0, 1), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (-1, -1), 8),
+            ('TOPPADDING', (0, 1), (-1, -1), 5),
+            ('BOTTOMPADDING', (0, 1), (-1, -1), 5),
+
+            # Grid
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+
+            # Alternating rows
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f2f2f2')]),
+        ] + table_outline(is_first, is_last)
+
+    elements.extend(split_table(rswa_data, [1.5*cm] * 10, rswa_style))
     elements.append(Spacer(1, 0.7*cm))
 
     # Section 3: Clinical Notes
@@ -268,10 +323,10 @@ def create_pdf_report(data_df):
 • Baseline detection: RMS in 5-second windows during artifact-free REM sleep<br/>
 • RSWA detection: EMG amplitude ≥2× baseline for ≥100 ms<br/>
 """.format(
-        data_df['Artifact_free_%'].mean(),
-        data_df['Artifact_free_%'].std(),
-        data_df['Artifact_free_%'].min(),
-        data_df['Artifact_free_%'].max()
+        stats.at['mean', 'Artifact_free_%'],
+        stats.at['std', 'Artifact_free_%'],
+        stats.at['min', 'Artifact_free_%'],
+        stats.at['max', 'Artifact_free_%']
     )
 
     notes_para = Paragraph(notes_text, normal_style)
@@ -285,7 +340,7 @@ def create_pdf_report(data_df):
         parent=styles['Normal'],
         fontSize=8,
         textColor=colors.grey,
-        fontName=KOREAN_FONT
+        fontName=korean_font
     )
 
     footer_text = f"""
@@ -4,9 +4,17 @@ Generate comprehensive report for PS0140-151 patients in Test1-10 format
 Includes true baseline amplitude calculations (Mean ± SD RMS in µV)
 """
 
+import hashlib
+import io
+import os
+import pickle
+import sys
+import zipfile
 import pandas as pd
 import numpy as np
 import pyedflib
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
 from pathlib import Path
 import warnings
 warnings.filterwarnings('ignore')
@@ -19,137 +27,243 @@ OUTPUT_DIR = BASE_DIR / "Results"
 # Patient IDs
 PATIENTS = ['PS0140_211029', 'PS0141_211030', 'PS0150_221111', 'PS0151_221112']
 
-def calculate_true_baseline_amplitude(edf_path, channel_name, sleep_profile_path):
+# Samples squared at a time in rms_windows (512 KiB of float32)
+RMS_BLOCK_SAMPLES = 1 << 17
+
+# REM epochs at most this far apart (seconds) are read from the EDF in one
+# go, the samples in between being read and dropped
+REM_READ_MAX_GAP = 30
+
+# Parsed RBDtector workbooks, one pickle per (path, mtime, size)
+CACHE_DIR = Path("~/.cache/rbdtector_ps_report").expanduser()
+
+def rem_sample_slices(start_time, fs, n_samples, sleep_stages):
     """
-    Calculate true baseline amplitude (Mean ± SD of RMS) during artifact-free REM sleep
+    Return the (start, end) sample range of every non-empty REM epoch of a
+    channel sampled at fs Hz from start_time, n_samples long.
     """
-    print(f"  Processing {channel_name}...")
+    # Sample i was taken at start_time + i * sample_period, so the samples
+    # in [start, end) are a slice: from the first sample at or after start
+    # up to the first at or after end (integer nanoseconds, no time index)
+    sample_period_ns = pd.to_timedelta(1 / fs, unit='s').value
+    start_time = pd.Timestamp(start_time)
+
+    def sample_offset(timestamp):
+        elapsed_ns = (timestamp - start_time).value
+        return min(max(-(-elapsed_ns // sample_period_ns), 0), n_samples)
+
+    # Find REM periods (stage == 'R' or stage contains 'REM')
+    slices = []
+    for i in range(len(sleep_stages) - 1):
+        stage = sleep_stages[i]['stage']
+
+        if stage == 'R' or 'REM' in stage.upper():
+            start = sample_offset(sleep_stages[i]['time'])
+            end = sample_offset(sleep_stages[i + 1]['time'])
+
+            # Keep this 30-second epoch if it overlaps the recording
+            if end > start:
+                slices.append((start, end))
+
+    return slices
+
+
+def coalesce_slices(slices, max_gap):
+    """
+    Group sorted (start, end) sample ranges into runs whose gaps are at most
+    max_gap samples.
+
+    Returns [(run_start, run_end, [slices of the run])].
+    """
+    runs = []
+    for start, end in slices:
+        if runs and start - runs[-1][1] <= max_gap:
+            runs[-1][1] = max(runs[-1][1], end)
+            runs[-1][2].append((start, end))
+        else:
+            runs.append([start, end, [(start, end)]])
+    return [tuple(run) for run in runs]
+
+
+def read_rem_signals(edf_path, channel_names, sleep_stages):
+    """
+    Read the REM epochs of the first channel whose label contains each name,
+    opening the EDF once.
 
+    Only the REM samples are read from disk (a fraction of the night), not
+    whole channels. Returns {name: ([REM epoch arrays], fs)}; names without
+    a matching channel are left out.
+    """
+    f = pyedflib.EdfReader(str(edf_path))
     try:
-        # Read EDF file
-        f = pyedflib.EdfReader(str(edf_path))
-
-        # Find channel index
-        channel_idx = None
-        for i in range(f.signals_in_file):
-            label = f.getLabel(i)
-            if channel_name in label:
-                channel_idx = i
-                break
-
-        if channel_idx is None:
-            f.close()
-            return np.nan, np.nan, "N/A"
-
-        # Read signal and sampling rate
-        signal = f.readSignal(channel_idx)
-        fs = f.getSampleFrequency(channel_idx)
         start_time = f.getStartdatetime()
+        labels = [f.getLabel(i) for i in range(f.signals_in_file)]
+        n_samples = f.getNSamples()
+
+        signals = {}
+        for channel_name in channel_names:
+            # Find channel index
+            channel_idx = next((i for i, label in enumerate(labels) if channel_name in label), None)
+            if channel_idx is not None:
+                fs = f.getSampleFrequency(channel_idx)
+
+                # Read runs of consecutive REM epochs with one call each and cut
+                # the epochs out of them; float32 (ample for µV EMG) halves
+                # the memory the RMS pass streams through
+                rem_signal_list = []
+                slices = rem_sample_slices(start_time, fs, n_samples[channel_idx], sleep_stages)
+                for run_start, run_end, run_slices in coalesce_slices(slices, int(REM_READ_MAX_GAP * fs)):
+                    run = f.readSignal(channel_idx, run_start, run_end - run_start).astype(np.float32)
+                    rem_signal_list.extend(run[start - run_start:end - run_start] for start, end in run_slices)
+                signals[channel_name] = (rem_signal_list, fs)
+
+        return signals
+    finally:
         f.close()
 
-        # Parse sleep profile (semicolon-separated format)
-        with open(sleep_profile_path, 'r') as f:
-            lines = f.readlines()
 
-        # Extract start date from first line
-        start_date_line = lines[0].strip()
-        # Format: "Start Time: DD.MM.YYYY HH:MM:SS"
-        start_date_str = start_date_line.replace('Start Time: ', '').strip()
-        file_start_time = pd.to_datetime(start_date_str, format='%d.%m.%Y %H:%M:%S')
+def parse_sleep_profile(sleep_profile_path):
+    """Return the sleep stages of a sleep profile as [{'time': Timestamp, 'stage': str}]."""
+    # Parse sleep profile (semicolon-separated format)
+    with open(sleep_profile_path, 'r') as f:
+        lines = f.readlines()
+
+    # Extract start date from first line
+    start_date_line = lines[0].strip()
+    # Format: "Start Time: DD.MM.YYYY HH:MM:SS"
+    start_date_str = start_date_line.replace('Start Time: ', '').strip()
+    file_start_time = pd.to_datetime(start_date_str, format='%d.%m.%Y %H:%M:%S')
 
-        # Parse sleep stages (lines after line 2)
-        sleep_stages = []
-        for line in lines[3:]:  # Skip first 3 lines (header)
-            line = line.strip()
-            if not line or ';' not in line:
-                continue
+    # Parse sleep stages (lines after line 2): "time;stage" lines only
+    stage_rows = [line.strip().split(';') for line in lines[3:]]  # Skip first 3 lines (header)
+    stage_rows = [parts for parts in stage_rows if len(parts) == 2]
 
-            parts = line.split(';')
-            if len(parts) != 2:
-                continue
+    # Parse time (HH:MM:SS,microseconds) of all stages in one call
+    start_date = file_start_time.strftime('%Y-%m-%d')
+    time_parts = [parts[0].strip().split(',') for parts in stage_rows]
+    timestamps = pd.to_datetime(
+        [f"{start_date} {hms_us[0]}.{hms_us[1] if len(hms_us) > 1 else '000000'}" for hms_us in time_parts],
+        format='%Y-%m-%d %H:%M:%S.%f'
+    )
 
-            time_str = parts[0].strip()
-            stage = parts[1].strip()
+    # Handle overnight recordings: once a time is before the start time or
+    # goes backwards (midnight was crossed), it and every later time are on
+    # the next day (the first stage is never moved)
+    crossed = np.zeros(len(timestamps), dtype=bool)
+    crossed[1:] = (timestamps[1:] < file_start_time) | (timestamps[1:] < timestamps[:-1])
+    next_day = np.logical_or.accumulate(crossed)
+    timestamps = timestamps + pd.to_timedelta(next_day.astype(np.int64), unit='D')
 
-            # Parse time (HH:MM:SS,microseconds)
-            time_parts = time_str.split(',')
-            hms = time_parts[0]  # HH:MM:SS
-            microsec = time_parts[1] if len(time_parts) > 1 else '000000'
+    sleep_stages = [{'time': timestamp, 'stage': parts[1].strip()}
+                    for timestamp, parts in zip(timestamps, stage_rows)]
 
-            # Create timestamp for this stage
-            timestamp = pd.to_datetime(
-                f"{file_start_time.strftime('%Y-%m-%d')} {hms}.{microsec}",
-                format='%Y-%m-%d %H:%M:%S.%f'
-            )
+    return sleep_stages
 
-            # Handle overnight recordings - if time is before start time, add 1 day
-            if timestamp < file_start_time and len(sleep_stages) > 0:
-                timestamp = timestamp + pd.Timedelta(days=1)
-            elif len(sleep_stages) > 0 and timestamp < sleep_stages[-1]['time']:
-                # If time went backwards, we crossed midnight
-                timestamp = timestamp + pd.Timedelta(days=1)
 
-            sleep_stages.append({'time': timestamp, 'stage': stage})
+def rms_windows(signal, window_size):
+    """
+    Return the RMS of each whole window_size-sample window of signal (a
+    window ending exactly at the last sample is not used).
+
+    The windows are rows of a reshaped view; a cache-sized block of rows is
+    handled at a time, and einsum sums each row's squares in one fused pass
+    (no squared copy of the block).
+    """
+    n_windows = max((len(signal) - 1) // window_size, 0)
+    windows = signal[:n_windows * window_size].reshape(n_windows, window_size)
 
-        if len(sleep_stages) == 0:
-            return np.nan, np.nan, "No sleep stages"
+    rms = np.empty(n_windows)
+    rows_per_block = max(RMS_BLOCK_SAMPLES // window_size, 1)
+    for start in range(0, n_windows, rows_per_block):
+        block = windows[start:start + rows_per_block]
+        rms[start:start + rows_per_block] = np.sqrt(np.einsum('ij,ij->i', block, block) / window_size)
+    return rms
 
-        # Create time index for signal
-        signal_index = pd.date_range(start=start_time, periods=len(signal), freq=f'{1/fs}S')
-        signal_series = pd.Series(signal, index=signal_index)
 
-        # Find REM periods (stage == 'R' or stage contains 'REM')
-        rem_signal_list = []
-        for i in range(len(sleep_stages) - 1):
-            stage = sleep_stages[i]['stage']
+def calculate_true_baseline_amplitude(channel_name, signals, sleep_stages):
+    """
+    Calculate true baseline amplitude (Mean ± SD of RMS) during artifact-free REM sleep
 
-            if stage == 'R' or 'REM' in stage.upper():
-                start = sleep_stages[i]['time']
-                end = sleep_stages[i + 1]['time']
+    signals comes from read_rem_signals, sleep_stages from
+    parse_sleep_profile; both are loaded once per patient.
+    """
+    print(f"  Processing {channel_name}...")
 
-                # Extract signal in this 30-second epoch
-                mask = (signal_series.index >= start) & (signal_series.index < end)
-                rem_chunk = signal_series[mask]
+    if channel_name not in signals:
+        return np.nan, np.nan, "N/A"
 
-                if len(rem_chunk) > 0:
-                    rem_signal_list.append(rem_chunk)
+    rem_signal_list, fs = signals[channel_name]
 
-        if len(rem_signal_list) == 0:
-            return np.nan, np.nan, "No REM"
+    if len(sleep_stages) == 0:
+        return np.nan, np.nan, "No sleep stages"
 
-        # Concatenate all REM periods
-        rem_signal_combined = pd.concat(rem_signal_list)
+    if len(rem_signal_list) == 0:
+        return np.nan, np.nan, "No REM"
 
-        if len(rem_signal_combined) == 0:
-            return np.nan, np.nan, "Empty REM"
+    # Concatenate all REM periods
+    rem_signal_combined = np.concatenate(rem_signal_list)
 
-        # Calculate RMS in 5-second windows
-        window_size = int(5 * fs)  # 5 seconds
-        rms_values = []
+    if len(rem_signal_combined) == 0:
+        return np.nan, np.nan, "Empty REM"
 
-        for i in range(0, len(rem_signal_combined) - window_size, window_size):
-            window = rem_signal_combined.iloc[i:i+window_size].values
-            rms = np.sqrt(np.mean(window**2))
-            rms_values.append(rms)
+    # Calculate RMS in 5-second windows
+    window_size = int(5 * fs)  # 5 seconds
+    rms_array = rms_windows(rem_signal_combined, window_size)
 
-        if len(rms_values) == 0:
-            return np.nan, np.nan, "Insufficient data"
+    if len(rms_array) == 0:
+        return np.nan, np.nan, "Insufficient data"
 
-        # Calculate statistics
-        rms_array = np.array(rms_values)
-        mean_rms = np.mean(rms_array)
-        std_rms = np.std(rms_array)
+    # Calculate statistics
+    mean_rms = np.mean(rms_array)
+    std_rms = np.std(rms_array)
 
-        # Format string
-        formatted = f"{mean_rms:.2f}±{std_rms:.2f}"
+    # Format string
+    formatted = f"{mean_rms:.2f}±{std_rms:.2f}"
 
-        return mean_rms, std_rms, formatted
+    return mean_rms, std_rms, formatted
 
-    except Exception as e:
-        print(f"    Error processing {channel_name}: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return np.nan, np.nan, f"Error: {str(e)}"
+
+def read_workbook_fields(xlsx_file):
+    """
+    Return {field name: value} of an RBDtector results workbook.
+
+    The parsed fields are cached on disk per (path, mtime, size), so an
+    unchanged workbook is not parsed again on later runs; an unreadable
+    cache entry is ignored and a failed cache write is not fatal.
+    """
+    stat = xlsx_file.stat()
+    key = hashlib.sha1(f"{xlsx_file.resolve()}|{stat.st_mtime_ns}|{stat.st_size}".encode()).hexdigest()
+    cache_path = CACHE_DIR / f"{key}.pkl"
+    try:
+        with cache_path.open("rb") as fp:
+            return pickle.load(fp)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+        pass
+
+    # Read the Excel file with no header (raw structure)
+    df_raw = pd.read_excel(xlsx_file, sheet_name='Sheet1', header=None, engine='openpyxl')
+
+    # Row 1 (index 1) has field names, Row 3 (index 3) has data
+    field_names = df_raw.iloc[1, :].tolist()
+    data_values = df_raw.iloc[3, :].tolist()
+
+    # Create dictionary from field names and values
+    excel_data = {}
+    for name, value in zip(field_names, data_values):
+        if pd.notna(name):
+            excel_data[name] = value
+
+    # Write atomically (temp file + rename); patients run in parallel processes
+    tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        with tmp_path.open("wb") as fp:
+            pickle.dump(excel_data, fp, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except OSError as exc:
+        print(f"Warning: could not write cache {cache_path}: {exc}", file=sys.stderr)
+
+    return excel_data
 
 
 def extract_rbdtector_data(patient_id):
@@ -157,93 +271,108 @@ def extract_rbdtector_data(patient_id):
     patient_dir = RESULTS_DIR / patient_id
     rbdtector_dir = patient_dir / "RBDtector output"
 
-    # Find most recent RBDtector results file
-    xlsx_files = list(rbdtector_dir.glob("RBDtector_results_*.xlsx"))
-    if not xlsx_files:
+    # Find most recent RBDtector results file (one scandir; none if the
+    # directory does not exist)
+    try:
+        with os.scandir(rbdtector_dir) as it:
+            xlsx_names = [entry.name for entry in it
+                          if entry.name.startswith('RBDtector_results_') and entry.name.endswith('.xlsx')
+                          and entry.is_file()]
+    except OSError:
+        xlsx_names = []
+    if not xlsx_names:
         print(f"  No RBDtector output found for {patient_id}")
         return None
 
     # Use the most recent file
-    xlsx_file = sorted(xlsx_files)[-1]
+    xlsx_file = rbdtector_dir / max(xlsx_names)
     print(f"  Reading: {xlsx_file.name}")
 
     try:
-        # Read the Excel file with no header (raw structure)
-        df_raw = pd.read_excel(xlsx_file, sheet_name='Sheet1', header=None, engine='openpyxl')
-
-        # Row 1 (index 1) has field names, Row 3 (index 3) has data
-        field_names = df_raw.iloc[1, :].tolist()
-        data_values = df_raw.iloc[3, :].tolist()
-
-        # Create dictionary from field names and values
-        excel_data = {}
-        for name, value in zip(field_names, data_values):
-            if pd.notna(name):
-                excel_data[name] = value
-
-        # Extract relevant data
-        data = {
-            'Patient': patient_id.split('_')[0],
-            'File': xlsx_file.name
-        }
-
-        # Calculate REM duration (in minutes)
-        if 'Global_REM_MiniEpochs' in excel_data:
-            rem_miniepochs = excel_data['Global_REM_MiniEpochs']
-            data['REM_Duration_min'] = (rem_miniepochs * 3) / 60  # 3 seconds per mini-epoch
-        else:
-            data['REM_Duration_min'] = np.nan
-
-        # Calculate artifact-free percentage
-        if 'Global_REM_MiniEpochs' in excel_data and 'Global_REM_MiniEpochs_WO-Artifacts' in excel_data:
-            total = excel_data['Global_REM_MiniEpochs']
-            artifact_free = excel_data['Global_REM_MiniEpochs_WO-Artifacts']
-            data['Artifact_free_%'] = (artifact_free / total) * 100 if total > 0 else 0
-        else:
-            data['Artifact_free_%'] = np.nan
-
-        # Extract muscle activity data
-        muscle_channels = {
-            'Chin1-Chin2': 'CHIN',
-            'Lat': 'LAT',
-            'Rat': 'RAT'
-        }
-
-        for edf_name, short_name in muscle_channels.items():
-            # Extract metrics for this channel
-            for metric in ['tonic', 'phasic', 'any']:
-                # Absolute values
-                abs_key = f'{edf_name}_{metric}_Abs'
-                if abs_key in excel_data:
-                    data[f'{short_name}_{metric.capitalize()}_Abs'] = excel_data[abs_key]
-                else:
-                    data[f'{short_name}_{metric.capitalize()}_Abs'] = 0
-
-                # Percentage values
-                pct_key = f'{edf_name}_{metric}_%'
-                if pct_key in excel_data:
-                    data[f'{short_name}_{metric.capitalize()}_%'] = excel_data[pct_key]
-                else:
-                    data[f'{short_name}_{metric.capitalize()}_%'] = 0
-
-        return data
-
-    except Exception as e:
+        excel_data = read_workbook_fields(xlsx_file)
+    except (OSError, ValueError, IndexError, zipfile.BadZipFile) as e:
+        # Unreadable workbook or unexpected sheet layout
         print(f"  Error reading {xlsx_file.name}: {str(e)}")
-        import traceback
-        traceback.print_exc()
         return None
 
+    # Extract relevant data
+    data = {
+        'Patient': patient_id.split('_')[0],
+        'File': xlsx_file.name
+    }
+
+    # Calculate REM duration (in minutes)
+    if 'Global_REM_MiniEpochs' in excel_data:
+        rem_miniepochs = excel_data['Global_REM_MiniEpochs']
+        data['REM_Duration_min'] = (rem_miniepochs * 3) / 60  # 3 seconds per mini-epoch
+    else:
+        data['REM_Duration_min'] = np.nan
+
+    # Calculate artifact-free percentage
+    if 'Global_REM_MiniEpochs' in excel_data and 'Global_REM_MiniEpochs_WO-Artifacts' in excel_data:
+        total = excel_data['Global_REM_MiniEpochs']
+        artifact_free = excel_data['Global_REM_MiniEpochs_WO-Artifacts']
+        data['Artifact_free_%'] = (artifact_free / total) * 100 if total > 0 else 0
+    else:
+        data['Artifact_free_%'] = np.nan
+
+    # Extract muscle activity data
+    muscle_channels = {
+        'Chin1-Chin2': 'CHIN',
+        'Lat': 'LAT',
+        'Rat': 'RAT'
+    }
+
+    for edf_name, short_name in muscle_channels.items():
+        # Extract metrics for this channel
+        for metric in ['tonic', 'phasic', 'any']:
+            # Absolute values
+            abs_key = f'{edf_name}_{metric}_Abs'
+            if abs_key in excel_data:
+                data[f'{short_name}_{metric.capitalize()}_Abs'] = excel_data[abs_key]
+            else:
+                data[f'{short_name}_{metric.capitalize()}_Abs'] = 0
+
+            # Percentage values
+            pct_key = f'{edf_name}_{metric}_%'
+            if pct_key in excel_data:
+                data[f'{short_name}_{metric.capitalize()}_%'] = excel_data[pct_key]
+            else:
+                data[f'{short_name}_{metric.capitalize()}_%'] = 0
+
+    return data
+
+
+def find_patient_files(patient_dir):
+    """
+    Return the converted EDFs ('*_converted.edf'), all EDFs ('*.edf') and
+    sleep profiles ('*Sleep profile*.txt') directly inside patient_dir, from
+    one scandir instead of a glob per pattern (empty if it does not exist).
+    """
+    converted_edf_files, edf_files, sleep_files = [], [], []
+    try:
+        with os.scandir(patient_dir) as it:
+            for entry in it:
+                name = entry.name
+                if name.endswith('.edf'):
+                    edf_files.append(Path(entry.path))
+                    if name.endswith('_converted.edf'):
+                        converted_edf_files.append(Path(entry.path))
+                elif 'Sleep profile' in name and name.endswith('.txt'):
+                    sleep_files.append(Path(entry.path))
+    except OSError:
+        pass
+    return converted_edf_files, edf_files, sleep_files
+
 
 def calculate_baselines_for_patient(patient_id):
     """Calculate true baseline amplitudes for all channels"""
     patient_dir = RESULTS_DIR / patient_id
 
-    # Find converted EDF file
-    edf_files = list(patient_dir.glob("*_converted.edf"))
-    if not edf_files:
-        # Try original EDF
-        edf_files = list(patient_dir.glob("*.edf"))
+    converted_edf_files, edf_files, sleep_files = find_patient_files(patient_dir)
+
+    # Find converted EDF file (otherwise try original EDF)
+    edf_files = converted_edf_files or edf_files
 
     if not edf_files:
         print(f"  No EDF file found for {patient_id}")
@@ -252,7 +381,6 @@ def calculate_baselines_for_patient(patient_id):
     edf_file = edf_files[0]
 
     # Find sleep profile
-    sleep_files = list(patient_dir.glob("*Sleep profile*.txt"))
     if not sleep_files:
         print(f"  No sleep profile found for {patient_id}")
         return {}
@@ -271,9 +399,23 @@ def calculate_baselines_for_patient(patient_id):
 
     baselines = {}
 
+    # Parse the sleep profile and read the REM epochs once for all channels
+    try:
+        sleep_stages = parse_sleep_profile(sleep_file)
+        signals = read_rem_signals(edf_file, channels, sleep_stages)
+    except (OSError, ValueError, IndexError) as e:
+        # Unreadable EDF or malformed sleep profile
+        for channel_edf, channel_short in channels.items():
+            print(f"  Processing {channel_edf}...")
+            print(f"    Error processing {channel_edf}: {str(e)}")
+            baselines[f'{channel_short}_Mean'] = np.nan
+            baselines[f'{channel_short}_Std'] = np.nan
+            baselines[f'{channel_short}_Baseline'] = f"Error: {str(e)}"
+        return baselines
+
     for channel_edf, channel_short in channels.items():
         mean_rms, std_rms, formatted = calculate_true_baseline_amplitude(
-            edf_file, channel_edf, sleep_file
+            channel_edf, signals, sleep_stages
         )
 
         baselines[f'{channel_short}_Mean'] = mean_rms
@@ -283,14 +425,15 @@ def calculate_baselines_for_patient(patient_id):
     return baselines
 
 
-def main():
-    print("=" * 80)
-    print("Generating PS0140-151 Comprehensive Report")
-    print("=" * 80)
-
-    all_data = []
+def process_patient(patient_id):
+    """
+    Extract RBDtector data and calculate baselines for one patient.
 
-    for patient_id in PATIENTS:
+    Runs in a worker process, so the console output is captured and returned
+    with the combined data (None without RBDtector output).
+    """
+    output = io.StringIO()
+    with redirect_stdout(output):
         print(f"\n[{patient_id}]")
 
         # Extract RBDtector data
@@ -298,7 +441,7 @@ def main():
         rbdtector_data = extract_rbdtector_data(patient_id)
 
         if rbdtector_data is None:
-            continue
+            return output.getvalue(), None
 
         # Calculate baseline amplitudes
         print("  Calculating true baseline amplitudes...")
@@ -306,10 +449,27 @@ def main():
 
         # Combine all data
         combined_data = {**rbdtector_data, **baseline_data}
-        all_data.append(combined_data)
 
         print(f"  ✓ Completed {patient_id}")
 
+    return output.getvalue(), combined_data
+
+
+def main():
+    print("=" * 80)
+    print("Generating PS0140-151 Comprehensive Report")
+    print("=" * 80)
+
+    all_data = []
+
+    # Patients are independent, so process them in parallel; each one's
+    # output is printed here in patient order
+    with ProcessPoolExecutor(max_workers=min(len(PATIENTS), os.cpu_count() or 1)) as executor:
+        for patient_output, combined_data in executor.map(process_patient, PATIENTS):
+            sys.stdout.write(patient_output)
+            if combined_data is not None:
+                all_data.append(combined_data)
+
     # Create DataFrame
     df = pd.DataFrame(all_data)
 
@@ -5,12 +5,132 @@ Usage: python3 generate_results_generic.py <test_number>
 Example: python3 generate_results_generic.py 3
 """
 
+import hashlib
+import os
+import pickle
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import pandas as pd
 import numpy as np
 from datetime import datetime
 
+
+def rolling_rms(x, window):
+    """
+    Return the RMS of every full window of x (len(x) - window + 1 values,
+    none if x is shorter than the window).
+
+    Uses prefix sums of the squares: each window's sum is the difference of
+    two cumulative sums, so the whole signal takes a few vectorised passes.
+    The sums are accumulated in float64 whatever the dtype of x.
+    """
+    if x.size < window:
+        return np.empty(0)
+
+    csq = np.empty(x.size + 1)
+    csq[0] = 0.0
+    np.cumsum(x * x, dtype=np.float64, out=csq[1:])
+    return np.sqrt((csq[window:] - csq[:-window]) / window)
+
+
+def artifact_free_rms(x, mask, window):
+    """
+    Return the rolling RMS of every window lying entirely inside one
+    contiguous run of mask (artifact-free REM), concatenated.
+
+    Windows never span the gap between two runs, so samples that are hours
+    apart are not mixed into one RMS value; runs shorter than the window add
+    nothing.
+    """
+    # Run boundaries: (start, end) pairs where mask switches on and off
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.view(np.int8), [0]))))
+    runs = [rolling_rms(x[start:end], window) for start, end in edges.reshape(-1, 2)]
+    return np.concatenate(runs) if runs else np.empty(0)
+
+
+def count_epochs(flag_series, seconds=30):
+    """
+    Return the number of seconds-long epochs with any True sample, the epochs
+    being the bins of resample(f'{seconds}s') (aligned to midnight of the
+    first day), without building the resampled series.
+    """
+    flags = flag_series.to_numpy(dtype=bool)
+    if not flags.any():
+        return 0
+
+    # Epoch number of every flagged sample; the index is sorted, so distinct
+    # epochs are where the number changes
+    idx = flag_series.index
+    epochs = np.asarray((idx[flags] - idx[0].normalize()) // pd.Timedelta(seconds=seconds))
+    return int(np.count_nonzero(np.diff(epochs))) + 1
+
+
+def baseline_stats(signal, mask, window):
+    """
+    Return (mean, std) of the artifact-free REM rolling RMS of one channel.
+
+    Works on the raw arrays (no Series is built); as with pandas, the mean is
+    NaN without values and the sample std (ddof=1) is NaN below two values.
+    """
+    baseline_rms = artifact_free_rms(signal, mask, window)
+    if baseline_rms.size == 0:
+        return np.nan, np.nan
+    std = baseline_rms.std(ddof=1) if baseline_rms.size > 1 else np.nan
+    return baseline_rms.mean(), std
+
+
+# RBDtector settings that read_input and prepare_evaluation depend on; all
+# of them are part of the prepared evaluation cache key
+PREPARED_SETTINGS = ('SIGNALS_TO_EVALUATE', 'RATE', 'FLOW', 'SNORE', 'HUMAN_ARTIFACTS',
+                     'HUMAN_BASELINE', 'CHIN', 'LEGS', 'ARMS')
+
+# Bump when the cached tuple changes (or to drop caches made by an older RBDtector)
+PREPARED_CACHE_VERSION = 1
+
+
+def prepared_cache_path(input_dir, output_dir, rbd_settings):
+    """
+    Return the cache file of the prepared evaluation of input_dir.
+
+    The key covers every file directly in input_dir (EDF and annotations:
+    name, mtime, size), the PREPARED_SETTINGS values of rbd_settings and
+    PREPARED_CACHE_VERSION. Changes to RBDtector's own code are not covered;
+    bump the version (or delete the cache) after upgrading it.
+    """
+    with os.scandir(input_dir) as it:
+        files = sorted((entry.name, entry.stat().st_mtime_ns, entry.stat().st_size)
+                       for entry in it if entry.is_file())
+    prepared_settings = [(name, getattr(rbd_settings, name)) for name in PREPARED_SETTINGS]
+    key = hashlib.blake2b(repr((PREPARED_CACHE_VERSION, files, prepared_settings)).encode(),
+                          digest_size=16).hexdigest()
+    return Path(output_dir) / f"cache_{key}.pkl"
+
+
+def load_prepared(cache_path):
+    """Return the cached prepare_evaluation() result, or None if there is no usable cache."""
+    try:
+        with open(cache_path, 'rb') as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+        return None
+
+
+def save_prepared(cache_path, prepared):
+    """Write the prepare_evaluation() result atomically, replacing older caches (best effort)."""
+    cache_path = Path(cache_path)
+    tmp_path = cache_path.with_name(cache_path.name + '.tmp')
+    try:
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(prepared, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+        for old_cache in cache_path.parent.glob('cache_*.pkl'):
+            if old_cache != cache_path:
+                old_cache.unlink()
+    except OSError as e:
+        print(f"  ⚠️  Could not write cache {cache_path}: {e}", file=sys.stderr)
+
+
 if len(sys.argv) != 2:
     print("Usage: python3 generate_results_generic.py <test_number>")
     print("Example: python3 generate_results_generic.py 3")
@@ -66,24 +186,39 @@ print(f"\nSignals: {settings.SIGNALS_TO_EVALUATE}")
 print(f"Chin: {settings.CHIN}, Legs: {settings.LEGS}\n")
 
 try:
-    # Step 1: Read input
-    print("Step 1: Reading EDF and annotations...")
-    raw_data, annotation_data = ir.read_input(
-        directory_name=input_dir,
-        signals_to_load=settings.SIGNALS_TO_EVALUATE.copy(),
-        read_human_rating=False,
-        read_baseline=False
-    )
-    print("  ✅ Data loaded")
-
     # Step 2: Create PSG object
     psg = PSG(input_dir, test_id)
 
-    # Step 3: Prepare evaluation
-    print("\nStep 2: Preparing evaluation...")
-    df_signals, is_REM_series, is_global_artifact_series, signal_names, sleep_phase_series = \
-        psg.prepare_evaluation(raw_data, annotation_data, settings.SIGNALS_TO_EVALUATE.copy(), settings.FLOW)
-    print("  ✅ Evaluation prepared")
+    # Reuse the prepared signals of an earlier run on unchanged inputs
+    cache_path = prepared_cache_path(input_dir, output_dir, settings)
+    prepared = load_prepared(cache_path)
+
+    if prepared is not None:
+        print("Steps 1-2: Loading prepared evaluation from cache...")
+        df_signals, is_REM_series, is_global_artifact_series, signal_names, sleep_phase_series = prepared
+        print(f"  ✅ Loaded {cache_path.name}")
+    else:
+        # Step 1: Read input
+        print("Step 1: Reading EDF and annotations...")
+        raw_data, annotation_data = ir.read_input(
+            directory_name=input_dir,
+            signals_to_load=settings.SIGNALS_TO_EVALUATE.copy(),
+            read_human_rating=False,
+            read_baseline=False
+        )
+        print("  ✅ Data loaded")
+
+        # Step 3: Prepare evaluation
+        print("\nStep 2: Preparing evaluation...")
+        df_signals, is_REM_series, is_global_artifact_series, signal_names, sleep_phase_series = \
+            psg.prepare_evaluation(raw_data, annotation_data, settings.SIGNALS_TO_EVALUATE.copy(), settings.FLOW)
+
+        # EMG in float32 (ample for µV) halves memory, the cache file and the
+        # bytes the RMS passes stream through
+        df_signals = df_signals.astype({name: np.float32 for name in signal_names})
+        save_prepared(cache_path, (df_signals, is_REM_series, is_global_artifact_series,
+                                   signal_names, sleep_phase_series))
+        print("  ✅ Evaluation prepared")
 
     # Step 4: Find global artifact-free REM
     print("\nStep 3: Finding artifact-free REM periods...")
@@ -95,10 +230,12 @@ try:
         )
 
     # Global statistics
-    total_rem_miniepochs = is_REM_series.sum()
-    artifact_free_rem_miniepochs = is_global_artifact_free_rem_sleep_miniepoch_series.sum()
-    total_rem_epochs = is_REM_series.resample('30s').sum().gt(0).sum()
-    artifact_free_rem_epochs = is_global_artifact_free_rem_sleep_epoch_series.resample('30s').sum().gt(0).sum()
+    # Counted on plain bool arrays (np.count_nonzero) rather than Series.sum()
+    total_rem_miniepochs = int(np.count_nonzero(is_REM_series.to_numpy(dtype=bool)))
+    artifact_free_rem_miniepochs = int(np.count_nonzero(
+        is_global_artifact_free_rem_sleep_miniepoch_series.to_numpy(dtype=bool)))
+    total_rem_epochs = count_epochs(is_REM_series)
+    artifact_free_rem_epochs = count_epochs(is_global_artifact_free_rem_sleep_epoch_series)
 
     print(f"  Total REM miniepochs: {total_rem_miniepochs:,}")
     print(f"  Artifact-free REM miniepochs: {artifact_free_rem_miniepochs:,} ({artifact_free_rem_miniepochs/total_rem_miniepochs*100:.1f}%)")
@@ -117,23 +254,29 @@ try:
         'Artifact_Free_Percentage': float(artifact_free_rem_miniepochs/total_rem_miniepochs*100 if total_rem_miniepochs > 0 else 0)
     }
 
+    # Artifact-free REM samples as a bool array aligned with df_signals
+    artifact_free_mask = is_global_artifact_free_rem_sleep_miniepoch_series.reindex(
+        df_signals.index, fill_value=False).to_numpy(dtype=bool)
+
+    # Channels are independent and the NumPy passes release the GIL, so the
+    # baselines are computed on one thread per channel
+    channel_stats = {}
+    if artifact_free_mask.any() and signal_names:
+        window = int(5*settings.RATE)  # 5 seconds
+        with ThreadPoolExecutor(max_workers=len(signal_names)) as executor:
+            futures = {
+                signal_name: executor.submit(baseline_stats, df_signals[signal_name].to_numpy(dtype=np.float32),
+                                             artifact_free_mask, window)
+                for signal_name in signal_names
+            }
+            channel_stats = {signal_name: future.result() for signal_name, future in futures.items()}
+
     for i, signal_name in enumerate(signal_names):
         print(f"\n  Processing {signal_name}...")
 
-        # Get signal data
-        signal_series = df_signals[signal_name]
-
-        # Calculate baseline in artifact-free REM
-        baseline_signal = signal_series[is_global_artifact_free_rem_sleep_miniepoch_series]
-
-        if len(baseline_signal) > 0:
-            # Calculate RMS in 5-second windows
-            baseline_rms = baseline_signal.rolling(window=int(5*settings.RATE), center=True).apply(
-                lambda x: np.sqrt(np.mean(x**2)), raw=True
-            )
-            baseline_mean = baseline_rms.mean()
-            baseline_std = baseline_rms.std()
-
+        # Baseline (RMS in 5-second windows) in artifact-free REM
+        if signal_name in channel_stats:
+            baseline_mean, baseline_std = channel_stats[signal_name]
             print(f"    Baseline RMS: {baseline_mean:.2f} ± {baseline_std:.2f} µV")
 
             # Store results
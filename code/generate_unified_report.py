@@ -4,7 +4,9 @@ Generate Unified RBD Analysis Report for Test1-10 and PS0140-151
 Combines both datasets in a consistent format
 """
 
+import os
 import pandas as pd
+from functools import lru_cache
 from pathlib import Path
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4, landscape
@@ -14,68 +16,130 @@ from reportlab.lib.enums import TA_CENTER, TA_LEFT
 from reportlab.platypus import (SimpleDocTemplate, Table, TableStyle, Paragraph,
                                 Spacer, PageBreak, KeepTogether)
 from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfbase.ttfonts import TTFont, TTFError
 from datetime import datetime
 
+# Korean font candidates: (font name, file, subfont index)
+KOREAN_FONT_CANDIDATES = [
+    ('AppleGothic', '/System/Library/Fonts/AppleSDGothicNeo.ttc', 0),
+    ('AppleGothic2', '/System/Library/Fonts/Supplemental/AppleGothic.ttf', 0),
+]
+
+def register_korean_font():
+    """Register the first available Korean font and return its name (Helvetica if none is available)"""
+    for name, path, subfont_index in KOREAN_FONT_CANDIDATES:
+        # Missing files cost a stat, not a failed font load
+        if not os.path.exists(path):
+            continue
+        try:
+            pdfmetrics.registerFont(TTFont(name, path, subfontIndex=subfont_index))
+        except (OSError, TTFError):
+            continue
+        print(f"✓ Korean font registered: {name}")
+        return name
+    print("⚠ No Korean font available - using Helvetica")
+    return 'Helvetica'
+
 # Register Korean font
-try:
-    pdfmetrics.registerFont(TTFont('AppleGothic', '/System/Library/Fonts/AppleSDGothicNeo.ttc', subfontIndex=0))
-    KOREAN_FONT = 'AppleGothic'
-    print("✓ Korean font registered: AppleGothic")
-except:
-    try:
-        pdfmetrics.registerFont(TTFont('AppleGothic2', '/System/Library/Fonts/Supplemental/AppleGothic.ttf'))
-        KOREAN_FONT = 'AppleGothic2'
-        print("✓ Korean font registered: AppleGothic2")
-    except:
-        KOREAN_FONT = 'Helvetica'
-        print("⚠ No Korean font available - using Helvetica")
+KOREAN_FONT = register_korean_font()
+
+# Paragraph styles, built once with the registered font
+STYLES = getSampleStyleSheet()
+
+TITLE_STYLE = ParagraphStyle(
+    'CustomTitle',
+    parent=STYLES['Heading1'],
+    fontSize=16,
+    textColor=colors.HexColor('#1f4788'),
+    spaceAfter=20,
+    alignment=TA_CENTER,
+    fontName=KOREAN_FONT
+)
+
+SUBTITLE_STYLE = ParagraphStyle(
+    'CustomSubtitle',
+    parent=STYLES['Normal'],
+    fontSize=11,
+    textColor=colors.HexColor('#2c5aa0'),
+    spaceAfter=12,
+    spaceBefore=12,
+    fontName=KOREAN_FONT
+)
+
+NORMAL_STYLE = ParagraphStyle(
+    'CustomNormal',
+    parent=STYLES['Normal'],
+    fontSize=9,
+    fontName=KOREAN_FONT,
+    leading=12
+)
+
+FOOTER_STYLE = ParagraphStyle(
+    'Footer',
+    parent=STYLES['Normal'],
+    fontSize=8,
+    textColor=colors.grey,
+    fontName=KOREAN_FONT
+)
 
 # Paths
 BASE_DIR = Path("/Users/hyeongsuk/Desktop/workspace/SNUH/Atonia_Index")
 RESULTS_DIR = BASE_DIR / "Results"
 OUTPUT_PDF = RESULTS_DIR / "Unified_RBD_Analysis_Report.pdf"
 
+@lru_cache(maxsize=None)
 def load_test_data():
-    """Load Test1-10 data"""
+    """Load Test1-10 data (read once per run; treat the result as read-only)"""
     baseline_df = pd.read_csv(RESULTS_DIR / "Test1-10_True_Baseline_Amplitudes.csv")
     indicators_df = pd.read_csv(RESULTS_DIR / "Test1-10_RBD_Indicators_Converted.csv")
-    rswa_complete_df = pd.read_csv(RESULTS_DIR / "Test1-10_RSWA_Complete.csv")
-
-    # Merge baseline with indicators
-    merged = baseline_df.merge(indicators_df, left_on='Test', right_on='Test', how='left')
-
-    # Merge with complete RSWA data (Tonic, Phasic, Any)
-    merged = merged.merge(rswa_complete_df[['Test', 'CHIN_Tonic_%', 'CHIN_Phasic_%', 'CHIN_Any_%']],
-                         left_on='Test', right_on='Test', how='left')
-
+    # Only the Tonic, Phasic and Any columns of the complete RSWA data are used
+    rswa_complete_df = pd.read_csv(RESULTS_DIR / "Test1-10_RSWA_Complete.csv",
+                                   usecols=['Test', 'CHIN_Tonic_%', 'CHIN_Phasic_%', 'CHIN_Any_%'])
+
+    # Merge baseline with indicators, then with complete RSWA data
+    merged = (baseline_df
+              .merge(indicators_df, on='Test', how='left')
+              .merge(rswa_complete_df, on='Test', how='left'))
+
+    # Same baseline column names as the PS0140-151 data
+    merged['CHIN_Mean'] = merged['CHIN1CHIN_Mean']
+    merged['CHIN_Std'] = merged['CHIN1CHIN_Std']
     merged['Patient'] = merged['Test']
     merged['Dataset'] = 'Test1-10'
 
     return merged
 
+@lru_cache(maxsize=None)
 def load_ps_data():
-    """Load PS0140-151 data"""
+    """Load PS0140-151 data (read once per run; treat the result as read-only)"""
     complete_df = pd.read_csv(RESULTS_DIR / "PS0140-151_Complete_Analysis.csv", encoding='utf-8-sig')
     complete_df['Dataset'] = 'PS0140-151'
     return complete_df
 
 def create_summary_table(test_df, ps_df, styles):
     """Create summary comparison table"""
+    # Mean and SD of each column in one pass; Test1-10 without the failed
+    # baselines (Test1, 9, 10 with 100% values)
+    test_stats = test_df.loc[test_df['CHIN_Any_%'] < 100,
+                             ['REM_Duration_min', 'Artifact_free_%', 'CHIN1CHIN_Mean', 'CHIN1CHIN_Std',
+                              'CHIN_Any_%']].agg(['mean', 'std'])
+    ps_stats = ps_df[['REM_Duration_min', 'Artifact_free_%', 'CHIN_Mean', 'CHIN_Std',
+                      'CHIN_Any_%']].agg(['mean', 'std'])
+
     data = [
         ['Dataset', 'N', 'REM Duration (min)', 'Artifact-free REM (%)', 'CHIN Baseline (µV)', 'CHIN Any (%)'],
         ['Test1-10',
          '7*',
-         f"{test_df[test_df['CHIN_Any_%'] < 100]['REM_Duration_min'].mean()/60:.1f}±{test_df[test_df['CHIN_Any_%'] < 100]['REM_Duration_min'].std()/60:.1f}",
-         f"{test_df[test_df['CHIN_Any_%'] < 100]['Artifact_free_%'].mean():.1f}±{test_df[test_df['CHIN_Any_%'] < 100]['Artifact_free_%'].std():.1f}",
-         f"{test_df[test_df['CHIN_Any_%'] < 100]['CHIN1CHIN_Mean'].mean():.1f}±{test_df[test_df['CHIN_Any_%'] < 100]['CHIN1CHIN_Std'].mean():.1f}",
-         f"{test_df[test_df['CHIN_Any_%'] < 100]['CHIN_Any_%'].mean():.1f}±{test_df[test_df['CHIN_Any_%'] < 100]['CHIN_Any_%'].std():.1f}"],
+         f"{test_stats.at['mean', 'REM_Duration_min']/60:.1f}±{test_stats.at['std', 'REM_Duration_min']/60:.1f}",
+         f"{test_stats.at['mean', 'Artifact_free_%']:.1f}±{test_stats.at['std', 'Artifact_free_%']:.1f}",
+         f"{test_stats.at['mean', 'CHIN1CHIN_Mean']:.1f}±{test_stats.at['mean', 'CHIN1CHIN_Std']:.1f}",
+         f"{test_stats.at['mean', 'CHIN_Any_%']:.1f}±{test_stats.at['std', 'CHIN_Any_%']:.1f}"],
         ['PS0140-151',
          '4',
-         f"{ps_df['REM_Duration_min'].mean():.1f}±{ps_df['REM_Duration_min'].std():.1f}",
-         f"{ps_df['Artifact_free_%'].mean():.1f}±{ps_df['Artifact_free_%'].std():.1f}",
-         f"{ps_df['CHIN_Mean'].mean():.2f}±{ps_df['CHIN_Std'].mean():.2f}",
-         f"{ps_df['CHIN_Any_%'].mean():.1f}±{ps_df['CHIN_Any_%'].std():.1f}"]
+         f"{ps_stats.at['mean', 'REM_Duration_min']:.1f}±{ps_stats.at['std', 'REM_Duration_min']:.1f}",
+         f"{ps_stats.at['mean', 'Artifact_free_%']:.1f}±{ps_stats.at['std', 'Artifact_free_%']:.1f}",
+         f"{ps_stats.at['mean', 'CHIN_Mean']:.2f}±{ps_stats.at['mean', 'CHIN_Std']:.2f}",
+         f"{ps_stats.at['mean', 'CHIN_Any_%']:.1f}±{ps_stats.at['std', 'CHIN_Any_%']:.1f}"]
     ]
 
     table = Table(data, colWidths=[2.5*cm, 1.5*cm, 2.5*cm, 3*cm, 3*cm, 2.5*cm])
@@ -94,106 +158,80 @@ def create_summary_table(test_df, ps_df, styles):
 
     return table
 
-def create_test_table(test_df, styles):
-    """Create Test1-10 detailed table (CHIN only)"""
-    # Filter valid data (exclude Test1, 9, 10 with 100%)
-    valid_df = test_df[test_df['CHIN_Any_%'] < 100].copy()
-
-    data = [['Patient\n환자', 'REM Duration\n(min)', 'Artifact-free\nREM (%)',
-             'CHIN Baseline\n(µV)', 'CHIN Tonic\n(%)', 'CHIN Phasic\n(%)', 'CHIN Any\n(%)', 'RSWA\nStatus']]
-
-    for _, row in valid_df.iterrows():
-        rswa_status = 'Positive' if row['CHIN_Any_%'] >= 24.0 else 'Negative'
-        data.append([
-            row['Patient'],
-            f"{row['REM_Duration_min']/60:.1f}",
-            f"{row['Artifact_free_%']:.1f}",
-            f"{row['CHIN1CHIN_Mean']:.1f}±{row['CHIN1CHIN_Std']:.1f}",
-            f"{row['CHIN_Tonic_%']:.1f}",
-            f"{row['CHIN_Phasic_%']:.1f}",
-            f"{row['CHIN_Any_%']:.1f}",
-            rswa_status
-        ])
-
-    # Add mean row
+# Header and style shared by the Test1-10 and PS0140-151 detail tables
+PATIENT_TABLE_HEADER = ['Patient\n환자', 'REM Duration\n(min)', 'Artifact-free\nREM (%)',
+                        'CHIN Baseline\n(µV)', 'CHIN Tonic\n(%)', 'CHIN Phasic\n(%)', 'CHIN Any\n(%)',
+                        'RSWA\nStatus']
+PATIENT_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2c5aa0')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -2), colors.beige),
+    ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#d9e2f3')),
+    ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+    ('BOX', (0, 0), (-1, -1), 1.5, colors.HexColor('#2c5aa0')),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -2), [colors.white, colors.HexColor('#f2f2f2')]),
+])
+
+def build_patient_table(df, rem_divisor, baseline_decimals):
+    """
+    Build a detail table with one row per patient and a Mean±SD row.
+
+    df needs the Patient, REM_Duration_min, Artifact_free_%, CHIN_Mean, CHIN_Std
+    and CHIN_Tonic/Phasic/Any_% columns; REM_Duration_min is divided by
+    rem_divisor to give minutes.
+    """
+    fmt1 = '{:.1f}'.format
+    fmt_baseline = f'{{:.{baseline_decimals}f}}'.format
+    rem = df['REM_Duration_min'] / rem_divisor
+
+    data = [PATIENT_TABLE_HEADER]
+
+    # Format whole columns at once (iterrows would box every row into a Series)
+    rows = pd.DataFrame({
+        'Patient': df['Patient'],
+        'REM': rem.map(fmt1),
+        'Artifact-free': df['Artifact_free_%'].map(fmt1),
+        'Baseline': df['CHIN_Mean'].map(fmt_baseline) + '±' + df['CHIN_Std'].map(fmt_baseline),
+        'Tonic': df['CHIN_Tonic_%'].map(fmt1),
+        'Phasic': df['CHIN_Phasic_%'].map(fmt1),
+        'Any': df['CHIN_Any_%'].map(fmt1),
+        'RSWA': (df['CHIN_Any_%'] >= 24.0).map({True: 'Positive', False: 'Negative'})
+    })
+    data.extend(rows.values.tolist())
+
+    # Add mean row (mean and SD of each column in one pass)
+    stats = df[['Artifact_free_%', 'CHIN_Mean', 'CHIN_Std',
+                'CHIN_Tonic_%', 'CHIN_Phasic_%', 'CHIN_Any_%']].agg(['mean', 'std'])
     data.append([
         'Mean±SD',
-        f"{valid_df['REM_Duration_min'].mean()/60:.1f}±{valid_df['REM_Duration_min'].std()/60:.1f}",
-        f"{valid_df['Artifact_free_%'].mean():.1f}±{valid_df['Artifact_free_%'].std():.1f}",
-        f"{valid_df['CHIN1CHIN_Mean'].mean():.1f}±{valid_df['CHIN1CHIN_Std'].mean():.1f}",
-        f"{valid_df['CHIN_Tonic_%'].mean():.1f}±{valid_df['CHIN_Tonic_%'].std():.1f}",
-        f"{valid_df['CHIN_Phasic_%'].mean():.1f}±{valid_df['CHIN_Phasic_%'].std():.1f}",
-        f"{valid_df['CHIN_Any_%'].mean():.1f}±{valid_df['CHIN_Any_%'].std():.1f}",
+        f"{rem.mean():.1f}±{rem.std():.1f}",
+        f"{stats.at['mean', 'Artifact_free_%']:.1f}±{stats.at['std', 'Artifact_free_%']:.1f}",
+        f"{fmt_baseline(stats.at['mean', 'CHIN_Mean'])}±{fmt_baseline(stats.at['mean', 'CHIN_Std'])}",
+        f"{stats.at['mean', 'CHIN_Tonic_%']:.1f}±{stats.at['std', 'CHIN_Tonic_%']:.1f}",
+        f"{stats.at['mean', 'CHIN_Phasic_%']:.1f}±{stats.at['std', 'CHIN_Phasic_%']:.1f}",
+        f"{stats.at['mean', 'CHIN_Any_%']:.1f}±{stats.at['std', 'CHIN_Any_%']:.1f}",
         '-'
     ])
 
     table = Table(data, colWidths=[2*cm, 2*cm, 2.2*cm, 3*cm, 2*cm, 2*cm, 2*cm, 2*cm])
-
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2c5aa0')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 9),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -2), colors.beige),
-        ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#d9e2f3')),
-        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ('BOX', (0, 0), (-1, -1), 1.5, colors.HexColor('#2c5aa0')),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -2), [colors.white, colors.HexColor('#f2f2f2')]),
-    ]))
+    table.setStyle(PATIENT_TABLE_STYLE)
 
     return table
 
+def create_test_table(test_df, styles):
+    """Create Test1-10 detailed table (CHIN only)"""
+    # Filter valid data (exclude Test1, 9, 10 with 100%); REM duration is in seconds
+    valid_df = test_df[test_df['CHIN_Any_%'] < 100]
+    return build_patient_table(valid_df, rem_divisor=60, baseline_decimals=1)
+
 def create_ps_table(ps_df, styles):
     """Create PS0140-151 detailed table (CHIN only)"""
-    data = [['Patient\n환자', 'REM Duration\n(min)', 'Artifact-free\nREM (%)',
-             'CHIN Baseline\n(µV)', 'CHIN Tonic\n(%)', 'CHIN Phasic\n(%)', 'CHIN Any\n(%)', 'RSWA\nStatus']]
-
-    for _, row in ps_df.iterrows():
-        rswa_status = 'Positive' if row['CHIN_Any_%'] >= 24.0 else 'Negative'
-        data.append([
-            row['Patient'],
-            f"{row['REM_Duration_min']:.1f}",
-            f"{row['Artifact_free_%']:.1f}",
-            f"{row['CHIN_Mean']:.2f}±{row['CHIN_Std']:.2f}",
-            f"{row['CHIN_Tonic_%']:.1f}",
-            f"{row['CHIN_Phasic_%']:.1f}",
-            f"{row['CHIN_Any_%']:.1f}",
-            rswa_status
-        ])
-
-    # Add mean row
-    data.append([
-        'Mean±SD',
-        f"{ps_df['REM_Duration_min'].mean():.1f}±{ps_df['REM_Duration_min'].std():.1f}",
-        f"{ps_df['Artifact_free_%'].mean():.1f}±{ps_df['Artifact_free_%'].std():.1f}",
-        f"{ps_df['CHIN_Mean'].mean():.2f}±{ps_df['CHIN_Std'].mean():.2f}",
-        f"{ps_df['CHIN_Tonic_%'].mean():.1f}±{ps_df['CHIN_Tonic_%'].std():.1f}",
-        f"{ps_df['CHIN_Phasic_%'].mean():.1f}±{ps_df['CHIN_Phasic_%'].std():.1f}",
-        f"{ps_df['CHIN_Any_%'].mean():.1f}±{ps_df['CHIN_Any_%'].std():.1f}",
-        '-'
-    ])
-
-    table = Table(data, colWidths=[2*cm, 2*cm, 2.2*cm, 3*cm, 2*cm, 2*cm, 2*cm, 2*cm])
-
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2c5aa0')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 9),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -2), colors.beige),
-        ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#d9e2f3')),
-        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ('BOX', (0, 0), (-1, -1), 1.5, colors.HexColor('#2c5aa0')),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -2), [colors.white, colors.HexColor('#f2f2f2')]),
-    ]))
-
-    return table
+    return build_patient_table(ps_df, rem_divisor=1, baseline_decimals=2)
 
 def create_pdf_report(test_df, ps_df):
     """Create unified PDF report"""
@@ -203,62 +241,32 @@ def create_pdf_report(test_df, ps_df):
         rightMargin=1*cm,
         leftMargin=1*cm,
         topMargin=2*cm,
-        bottomMargin=2*cm
+        bottomMargin=2*cm,
+        # Uncompressed page streams: a larger file, but no zlib pass per page
+        pageCompression=0
     )
 
     elements = []
-    styles = getSampleStyleSheet()
-
-    # Title style
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=16,
-        textColor=colors.HexColor('#1f4788'),
-        spaceAfter=20,
-        alignment=TA_CENTER,
-        fontName=KOREAN_FONT
-    )
-
-    # Subtitle style
-    subtitle_style = ParagraphStyle(
-        'CustomSubtitle',
-        parent=styles['Normal'],
-        fontSize=11,
-        textColor=colors.HexColor('#2c5aa0'),
-        spaceAfter=12,
-        spaceBefore=12,
-        fontName=KOREAN_FONT
-    )
-
-    # Normal style
-    normal_style = ParagraphStyle(
-        'CustomNormal',
-        parent=styles['Normal'],
-        fontSize=9,
-        fontName=KOREAN_FONT,
-        leading=12
-    )
 
     # Add title
     title = Paragraph(
         "Unified RBD Analysis Report: Test1-10 and PS0140-151<br/>통합 RBD 분석 보고서: Test1-10 및 PS0140-151",
-        title_style
+        TITLE_STYLE
     )
     elements.append(title)
     elements.append(Spacer(1, 0.3*cm))
 
     # Add generation date
     date_text = f"Report Generated: {datetime.now().strftime('%Y-%m-%d %H:%M')}"
-    date_para = Paragraph(date_text, normal_style)
+    date_para = Paragraph(date_text, NORMAL_STYLE)
     elements.append(date_para)
     elements.append(Spacer(1, 0.5*cm))
 
     # Section 1: Summary Comparison
-    section_title = Paragraph("<b>1. Summary Comparison / 데이터셋 비교 요약</b>", subtitle_style)
+    section_title = Paragraph("<b>1. Summary Comparison / 데이터셋 비교 요약</b>", SUBTITLE_STYLE)
     elements.append(section_title)
 
-    summary_table = create_summary_table(test_df, ps_df, styles)
+    summary_table = create_summary_table(test_df, ps_df, STYLES)
     elements.append(summary_table)
     elements.append(Spacer(1, 0.3*cm))
 
@@ -270,15 +278,15 @@ def create_pdf_report(test_df, ps_df):
 • Both groups show similar CHIN Any % despite different baseline amplitudes<br/>
 • 두 그룹 모두 유사한 CHIN Any % 보이나 baseline amplitude는 14배 차이
 """
-    note_para = Paragraph(note_text, normal_style)
+    note_para = Paragraph(note_text, NORMAL_STYLE)
     elements.append(note_para)
     elements.append(Spacer(1, 0.7*cm))
 
     # Section 2: Test1-10 Detailed Results
-    section_title2 = Paragraph("<b>2. Test1-10 Detailed Results / Test1-10 상세 결과</b>", subtitle_style)
+    section_title2 = Paragraph("<b>2. Test1-10 Detailed Results / Test1-10 상세 결과</b>", SUBTITLE_STYLE)
     elements.append(section_title2)
 
-    test_table = create_test_table(test_df, styles)
+    test_table = create_test_table(test_df, STYLES)
     elements.append(test_table)
     elements.append(Spacer(1, 0.3*cm))
 
@@ -299,15 +307,15 @@ def create_pdf_report(test_df, ps_df):
   - Test7: Tonic 0.0%, Phasic 22.3%, Any 22.4%<br/>
 • <b>Excluded</b>: 3 patients - Test1, Test9, Test10 (baseline calculation failed → all values 100%)
 """
-    test_note_para = Paragraph(test_note, normal_style)
+    test_note_para = Paragraph(test_note, NORMAL_STYLE)
     elements.append(test_note_para)
     elements.append(Spacer(1, 0.7*cm))
 
     # Section 3: PS0140-151 Detailed Results
-    section_title3 = Paragraph("<b>3. PS0140-151 Detailed Results / PS0140-151 상세 결과</b>", subtitle_style)
+    section_title3 = Paragraph("<b>3. PS0140-151 Detailed Results / PS0140-151 상세 결과</b>", SUBTITLE_STYLE)
     elements.append(section_title3)
 
-    ps_table = create_ps_table(ps_df, styles)
+    ps_table = create_ps_table(ps_df, STYLES)
     elements.append(ps_table)
     elements.append(Spacer(1, 0.3*cm))
 
@@ -319,12 +327,12 @@ def create_pdf_report(test_df, ps_df):
 • Test1-10 대비 매우 낮은 baseline amplitude (CHIN: 1.46±0.23 µV vs 21.0±7.4 µV)<br/>
 • Good data quality: 89.8-95.8% artifact-free REM / 우수한 데이터 품질: 89.8-95.8% artifact-free REM
 """
-    ps_note_para = Paragraph(ps_note, normal_style)
+    ps_note_para = Paragraph(ps_note, NORMAL_STYLE)
     elements.append(ps_note_para)
     elements.append(Spacer(1, 0.7*cm))
 
     # Section 4: Clinical Interpretation Guide
-    section_title4 = Paragraph("<b>4. Clinical Interpretation Guide / 임상 해석 지침</b>", subtitle_style)
+    section_title4 = Paragraph("<b>4. Clinical Interpretation Guide / 임상 해석 지침</b>", SUBTITLE_STYLE)
     elements.append(section_title4)
 
     clinical_text = """
@@ -383,27 +391,19 @@ def create_pdf_report(test_df, ps_df):
 • <b>SINBAR method & RBDtector</b>: Röthenbacher et al. (2022). Sci Rep, 12:20886. doi: 10.1038/s41598-022-25361-x<br/>
 • <b>Original SINBAR criteria</b>: Frauscher et al. (2012). Sleep, 35(8):1097-1103. doi: 10.5665/sleep.1992
 """
-    clinical_para = Paragraph(clinical_text, normal_style)
+    clinical_para = Paragraph(clinical_text, NORMAL_STYLE)
     elements.append(clinical_para)
 
     elements.append(Spacer(1, 0.5*cm))
 
     # Footer
-    footer_style = ParagraphStyle(
-        'Footer',
-        parent=styles['Normal'],
-        fontSize=8,
-        textColor=colors.grey,
-        fontName=KOREAN_FONT
-    )
-
     footer_text = f"""
 Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}<br/>
 Data source: RBDtector automated analysis (November 2025)<br/>
 Report format: Unified format for Test1-10 and PS0140-151 datasets<br/>
 Seoul National University Hospital Sleep Medicine Center
 """
-    footer_para = Paragraph(footer_text, footer_style)
+    footer_para = Paragraph(footer_text, FOOTER_STYLE)
     elements.append(footer_para)
 
     # Build PDF
@@ -1,6 +1,6 @@
 
+import sys
 import pyedflib
-import numpy as np
 
 def inspect_edf(file_path):
     try:
@@ -21,23 +21,26 @@ def inspect_edf(file_path):
         
         print("\nSignal Headers:")
         print("===============")
-        signal_labels = f.getSignalLabels()
-        for i in range(f.signals_in_file):
+        # All signal headers in one call instead of eight getters per signal
+        for i, signal_header in enumerate(f.getSignalHeaders()):
             print(f"  - Signal {i}:")
-            print(f"    Label: {signal_labels[i]}")
-            print(f"    Dimension: {f.getPhysicalDimension(i)}")
-            print(f"    Sample Frequency: {f.getSampleFrequency(i)}")
-            print(f"    Physical Min/Max: {f.getPhysicalMinimum(i)} / {f.getPhysicalMaximum(i)}")
-            print(f"    Digital Min/Max: {f.getDigitalMinimum(i)} / {f.getDigitalMaximum(i)}")
-            print(f"    Transducer: {f.getTransducer(i)}")
-            print(f"    Prefilter: {f.getPrefilter(i)}")
+            print(f"    Label: {signal_header['label']}")
+            print(f"    Dimension: {signal_header['dimension']}")
+            print(f"    Sample Frequency: {signal_header['sample_frequency']}")
+            print(f"    Physical Min/Max: {signal_header['physical_min']} / {signal_header['physical_max']}")
+            print(f"    Digital Min/Max: {signal_header['digital_min']} / {signal_header['digital_max']}")
+            print(f"    Transducer: {signal_header['transducer']}")
+            print(f"    Prefilter: {signal_header['prefilter']}")
 
         print("\nAnnotations in file:")
         print("======================")
         annotations = f.readAnnotations()
         if annotations[0].size > 0:
-            for n in np.arange(annotations[0].size):
-                print(f"- Onset: {annotations[0][n]}s, Duration: {annotations[1][n]}s, Event: {annotations[2][n]}")
+            # Format as plain Python floats and write the listing in one call
+            onsets, durations, events = annotations
+            lines = [f"- Onset: {onset}s, Duration: {duration}s, Event: {event}"
+                     for onset, duration, event in zip(onsets.tolist(), durations.tolist(), events)]
+            sys.stdout.write("\n".join(lines) + "\n")
         else:
             print("No annotations found in the file.")
 
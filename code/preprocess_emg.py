@@ -9,7 +9,7 @@ Purpose: Remove DC/low-frequency contamination and 60 Hz power line interference
 Evidence-based filter parameters determined from signal analysis (251105_02):
 - CHIN: High-pass 10 Hz, Low-pass 100 Hz, Notch 60 Hz (Q=30)
 - LEGS: High-pass 15 Hz, Low-pass 100 Hz, Notch 60 Hz (Q=30)
-- Filter type: Butterworth 4th order (zero-phase via filtfilt)
+- Filter type: Butterworth 4th order (zero-phase via sosfiltfilt)
 
 Author: Research Team
 Date: 2025-11-05
@@ -17,6 +17,8 @@ Date: 2025-11-05
 
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 import numpy as np
 from scipy import signal
@@ -54,9 +56,16 @@ CHANNEL_PATTERNS = {
     'LLEG': 'LLEG'
 }
 
+# Label keywords of the EMG channel types (matched in the upper-cased label)
+CHIN_KEYWORDS = ('CHIN',)
+LEG_KEYWORDS = ('RLEG', 'LLEG', 'RAT', 'LAT')
+
 # Butterworth filter order
 FILTER_ORDER = 4
 
+# Welch segment length for the frequency analysis (16 s at 256 Hz)
+WELCH_NPERSEG = 4096
+
 # ============================================================================
 # Filter Design Functions / 필터 설계 함수
 # ============================================================================
@@ -72,7 +81,7 @@ def design_bandpass_filter(lowcut, highcut, fs, order=4):
         order: Filter order
 
     Returns:
-        b, a: Filter coefficients
+        sos: Filter coefficients as second-order sections
     """
     nyq = 0.5 * fs
 
@@ -87,8 +96,10 @@ def design_bandpass_filter(lowcut, highcut, fs, order=4):
 
     low = lowcut / nyq
     high = highcut / nyq
-    b, a = signal.butter(order, [low, high], btype='band')
-    return b, a
+    # Second-order sections stay well conditioned at the doubled (bandpass)
+    # order, unlike a single (b, a) polynomial pair
+    sos = signal.butter(order, [low, high], btype='band', output='sos')
+    return sos
 
 def design_notch_filter(f0, fs, Q=30):
     """
@@ -100,43 +111,76 @@ def design_notch_filter(f0, fs, Q=30):
         Q: Quality factor (higher = narrower notch)
 
     Returns:
-        b, a: Filter coefficients
+        sos: Filter coefficients as second-order sections
     """
     w0 = f0 / (fs / 2)  # Normalized frequency
-    b, a = signal.iirnotch(w0, Q)
-    return b, a
+    sos = signal.tf2sos(*signal.iirnotch(w0, Q))
+    return sos
 
-def apply_filters(data, channel_type, fs):
+@lru_cache(maxsize=8)
+def design_emg_filter(channel_type, fs):
     """
-    Apply bandpass and notch filters to EMG signal.
+    Design the full EMG filter of a channel type: bandpass and notch as one
+    cascade of second-order sections. Cached per (channel_type, fs), so every
+    channel and file shares one design (do not modify the returned array).
 
     Parameters:
-        data: Signal data (1D numpy array)
         channel_type: 'CHIN' or 'LEG'
         fs: Sampling frequency (Hz)
 
     Returns:
-        filtered_data: Filtered signal
+        sos: Filter coefficients as second-order sections
     """
     # Get filter parameters for this channel type
     params = FILTER_PARAMS[channel_type]
 
     # Step 1: Bandpass filter (combines high-pass and low-pass)
-    b_bp, a_bp = design_bandpass_filter(
+    sos_bp = design_bandpass_filter(
         params['highpass'],
         params['lowpass'],
         fs,
         order=FILTER_ORDER
     )
-    filtered = signal.filtfilt(b_bp, a_bp, data)
 
     # Step 2: Notch filter for 60 Hz
-    b_notch, a_notch = design_notch_filter(
+    sos_notch = design_notch_filter(
         params['notch'],
         fs,
         Q=params['notch_q']
     )
-    filtered = signal.filtfilt(b_notch, a_notch, filtered)
+
+    return np.vstack([sos_bp, sos_notch])
+
+def apply_filters(data, channel_type, fs, zero_phase=True):
+    """
+    Apply bandpass and notch filters to EMG signal.
+
+    Parameters:
+        data: Signal data (1D numpy array)
+        channel_type: 'CHIN' or 'LEG'
+        fs: Sampling frequency (Hz)
+        zero_phase: Filter forward and backward (default); if False, filter
+            in a single forward pass (about half the time, but phase-shifted)
+
+    Returns:
+        filtered_data: Filtered signal
+    """
+    # float32 data and coefficients: sosfiltfilt then runs its float32 kernel
+    # and moves half the bytes (EMG is 16-bit at most, well within float32)
+    data = np.ascontiguousarray(data, dtype=np.float32)
+    sos = design_emg_filter(channel_type, fs).astype(np.float32)
+
+    if not zero_phase:
+        # Single causal pass, started from the first sample to avoid a start-up
+        # transient. The output lags the input by the filter's group delay
+        # (a few ms in the EMG band), which envelope/amplitude based detection
+        # tolerates but sample-exact timing does not.
+        zi = (signal.sosfilt_zi(sos) * data[0]).astype(np.float32)
+        filtered, _ = signal.sosfilt(sos, data, zi=zi)
+        return filtered
+
+    # Both filters as one cascade: a single forward-backward pass over the data
+    filtered = signal.sosfiltfilt(sos, data)
 
     return filtered
 
@@ -146,7 +190,7 @@ def apply_filters(data, channel_type, fs):
 
 def analyze_frequency_content(data, fs, label=""):
     """
-    Analyze frequency content of signal using FFT.
+    Analyze frequency content of signal using Welch's averaged periodogram.
 
     Parameters:
         data: Signal data
@@ -158,20 +202,34 @@ def analyze_frequency_content(data, fs, label=""):
         psd: Power spectral density
         stats: Dictionary of frequency band statistics
     """
-    # Compute FFT
-    n = len(data)
-    fft = np.fft.rfft(data)
-    freqs = np.fft.rfftfreq(n, d=1/fs)
-    psd = np.abs(fft) ** 2
+    # Welch PSD in float32: the periodogram averaged over WELCH_NPERSEG-sample
+    # segments instead of one FFT over the whole multi-hour recording.
+    # Rectangular, non-overlapping segments without detrending estimate the
+    # same |rfft|^2 spectrum (DC offset included) on a coarser grid.
+    freqs, psd = signal.welch(data.astype(np.float32, copy=False), fs=fs,
+                              window='boxcar', nperseg=WELCH_NPERSEG, noverlap=0,
+                              detrend=False, scaling='density')
+
+    # welch doubles the bins between DC and Nyquist (one-sided spectrum);
+    # undo it so DC keeps the weight it has in |rfft|^2. The few thousand bins
+    # go back to float64 so the band sums stay JSON-serialisable np.float64.
+    psd = psd.astype(np.float64)
+    psd[1:-1] /= 2
 
     # Normalize PSD
     total_power = np.sum(psd)
     psd_norm = psd / total_power * 100  # Percentage
 
-    # Calculate power in different bands
-    dc_low = np.sum(psd_norm[(freqs >= 0) & (freqs < 10)])
-    emg_band = np.sum(psd_norm[(freqs >= 20) & (freqs <= 100)])
-    hz_60 = np.sum(psd_norm[(freqs >= 58) & (freqs <= 62)])
+    # Calculate power in different bands. freqs is sorted, so each band is a
+    # contiguous slice found by binary search: 0 <= f < 10, 20 <= f <= 100
+    # and 58 <= f <= 62
+    dc_start, emg_start, hz_60_start = np.searchsorted(freqs, [0, 20, 58], side='left')
+    dc_stop = np.searchsorted(freqs, 10, side='left')
+    emg_stop, hz_60_stop = np.searchsorted(freqs, [100, 62], side='right')
+
+    dc_low = psd_norm[dc_start:dc_stop].sum()
+    emg_band = psd_norm[emg_start:emg_stop].sum()
+    hz_60 = psd_norm[hz_60_start:hz_60_stop].sum()
 
     stats = {
         'dc_low': dc_low,
@@ -202,9 +260,9 @@ def identify_channel_type(label):
         'CHIN', 'LEG', or None
     """
     label_upper = label.upper()
-    if 'CHIN' in label_upper:
+    if any(keyword in label_upper for keyword in CHIN_KEYWORDS):
         return 'CHIN'
-    elif 'RLEG' in label_upper or 'LLEG' in label_upper or 'RAT' in label_upper or 'LAT' in label_upper:
+    elif any(keyword in label_upper for keyword in LEG_KEYWORDS):
         return 'LEG'
     return None
 
@@ -226,9 +284,10 @@ def read_edf(edf_path):
 
     f = pyedflib.EdfReader(str(edf_path))
 
-    # Get header info
+    # Get header info (all signal headers in one call)
     n_channels = f.signals_in_file
     signal_labels = f.getSignalLabels()
+    signal_header_list = f.getSignalHeaders()
 
     print(f"\nChannels found: {n_channels}")
     for i, label in enumerate(signal_labels):
@@ -238,7 +297,7 @@ def read_edf(edf_path):
     fs = None
     for i, label in enumerate(signal_labels):
         if identify_channel_type(label):
-            fs = f.getSampleFrequency(i)
+            fs = signal_header_list[i]['sample_frequency']
             print(f"\n⚙️  Detected sampling rate: {fs} Hz (from {label})")
             break
 
@@ -254,47 +313,28 @@ def read_edf(edf_path):
         data = f.readSignal(i)
         signals[label] = data
 
-        # Get signal header info
-        signal_headers[label] = {
-            'label': label,
-            'dimension': f.getPhysicalDimension(i),
-            'sample_rate': f.getSampleFrequency(i),
-            'physical_max': f.getPhysicalMaximum(i),
-            'physical_min': f.getPhysicalMinimum(i),
-            'digital_max': f.getDigitalMaximum(i),
-            'digital_min': f.getDigitalMinimum(i),
-            'transducer': f.getTransducer(i),
-            'prefilter': f.getPrefilter(i)
-        }
+        # Signal header info (label, dimension, sample_frequency, physical and
+        # digital min/max, transducer, prefilter)
+        signal_headers[label] = signal_header_list[i]
 
         print(f"\n  {label}: {len(data)} samples, "
-              f"{len(data)/f.getSampleFrequency(i):.1f} seconds")
-
-    # Get header for writing new EDF
-    header = {
-        'technician': f.getTechnician(),
-        'recording_additional': f.getRecordingAdditional(),
-        'patientname': f.getPatientName(),
-        'patient_additional': f.getPatientAdditional(),
-        'patientcode': f.getPatientCode(),
-        'equipment': f.getEquipment(),
-        'admincode': f.getAdmincode(),
-        'sex': f.getSex(),
-        'startdate': f.getStartdatetime(),
-        'birthdate': f.getBirthdate(),
-        'signal_headers': signal_headers
-    }
+              f"{len(data)/signal_header_list[i]['sample_frequency']:.1f} seconds")
+
+    # Get header for writing new EDF (patient and recording fields, start date)
+    header = f.getHeader()
+    header['signal_headers'] = signal_headers
 
     f.close()
     return signals, header, fs
 
-def preprocess_edf(input_path, output_path):
+def preprocess_edf(input_path, output_path, zero_phase=True):
     """
     Preprocess EDF file: apply filters to EMG channels.
 
     Parameters:
         input_path: Input EDF file path
         output_path: Output EDF file path (preprocessed)
+        zero_phase: Zero-phase (forward-backward) filtering; see apply_filters
 
     Returns:
         success: Boolean indicating success
@@ -316,6 +356,7 @@ def preprocess_edf(input_path, output_path):
         'output_file': str(output_path),
         'timestamp': datetime.now().isoformat(),
         'sampling_rate': float(fs),
+        'zero_phase': zero_phase,
         'channels': {}
     }
 
@@ -324,8 +365,25 @@ def preprocess_edf(input_path, output_path):
     print(f"{'='*70}")
     print(f"Using sampling rate: {fs} Hz")
 
-    for label, data in signals.items():
-        channel_type = identify_channel_type(label)
+    # Channel type of every label, looked up once and reused for the writer
+    channel_types = {label: identify_channel_type(label) for label in signals}
+
+    # Filter the EMG channels on one thread each (sosfiltfilt releases the
+    # GIL), overlapping with the frequency analysis below
+    emg_labels = [label for label, channel_type in channel_types.items() if channel_type]
+    executor = ThreadPoolExecutor(max_workers=max(len(emg_labels), 1))
+    filter_futures = {
+        label: executor.submit(apply_filters, signals[label], channel_types[label], fs,
+                               zero_phase=zero_phase)
+        for label in emg_labels
+    }
+    executor.shutdown(wait=False)
+
+    # Take each raw signal out of signals as it is processed, so a raw EMG
+    # channel is freed once its filtered copy replaces it
+    for label in list(signals):
+        data = signals.pop(label)
+        channel_type = channel_types[label]
 
         if channel_type:
             print(f"\n[{label}] - {channel_type} channel")
@@ -339,8 +397,8 @@ def preprocess_edf(input_path, output_path):
                 data, fs, label="Original"
             )
 
-            # Apply filters (use actual fs from EDF)
-            filtered_data = apply_filters(data, channel_type, fs)
+            # Filtered signal (use actual fs from EDF)
+            filtered_data = filter_futures[label].result()
 
             # Analyze after
             print(f"\n  After preprocessing:")
@@ -383,14 +441,14 @@ def preprocess_edf(input_path, output_path):
     print("WRITING PREPROCESSED EDF / 전처리된 EDF 작성")
     print(f"{'='*70}")
 
-    write_edf(output_path, preprocessed_signals, header, fs)
+    write_edf(output_path, preprocessed_signals, header, fs, channel_types=channel_types)
 
     print(f"\n✅ Preprocessing complete!")
     print(f"   Output: {output_path}")
 
     return True, report
 
-def write_edf(output_path, signals_dict, header, fs):
+def write_edf(output_path, signals_dict, header, fs, channel_types=None):
     """
     Write signals to new EDF file.
 
@@ -399,6 +457,7 @@ def write_edf(output_path, signals_dict, header, fs):
         signals_dict: Dictionary of {label: signal_data} (in order)
         header: Header information from original EDF (includes signal_headers)
         fs: Sampling rate (Hz)
+        channel_types: {label: identify_channel_type(label)} if already known
     """
     # Create EDF writer
     n_channels = len(signals_dict)
@@ -427,7 +486,10 @@ def write_edf(output_path, signals_dict, header, fs):
         orig_header = signal_headers_orig.get(label, {})
 
         # Update prefilter string for EMG channels
-        channel_type = identify_channel_type(label)
+        if channel_types is not None:
+            channel_type = channel_types[label]
+        else:
+            channel_type = identify_channel_type(label)
         if channel_type:
             prefilter = (f"HP:{FILTER_PARAMS[channel_type]['highpass']}Hz "
                         f"LP:{FILTER_PARAMS[channel_type]['lowpass']}Hz "
@@ -438,7 +500,7 @@ def write_edf(output_path, signals_dict, header, fs):
         ch_dict = {
             'label': orig_header.get('label', label),
             'dimension': orig_header.get('dimension', 'uV'),
-            'sample_frequency': orig_header.get('sample_rate', fs),
+            'sample_frequency': orig_header.get('sample_frequency', fs),
             'physical_max': orig_header.get('physical_max', 1000),
             'physical_min': orig_header.get('physical_min', -1000),
             'digital_max': orig_header.get('digital_max', 32767),
@@ -461,12 +523,13 @@ def write_edf(output_path, signals_dict, header, fs):
 # Main Processing Function / 메인 처리 함수
 # ============================================================================
 
-def process_test_file(test_name):
+def process_test_file(test_name, zero_phase=True):
     """
     Process a single test file.
 
     Parameters:
         test_name: Test name (e.g., 'Test1')
+        zero_phase: Zero-phase (forward-backward) filtering; see apply_filters
 
     Returns:
         success: Boolean
@@ -484,7 +547,7 @@ def process_test_file(test_name):
         return False, None
 
     # Preprocess
-    success, report = preprocess_edf(input_edf, output_edf)
+    success, report = preprocess_edf(input_edf, output_edf, zero_phase=zero_phase)
 
     # Save report
     if success:
@@ -512,6 +575,11 @@ def main():
         action='store_true',
         help='Generate validation plots'
     )
+    parser.add_argument(
+        '--single-pass',
+        action='store_true',
+        help='Filter in one forward pass instead of zero-phase (faster, phase-shifted)'
+    )
 
     args = parser.parse_args()
 
@@ -523,7 +591,7 @@ def main():
     print(f"{'='*70}")
 
     # Process
-    success, report = process_test_file(args.test_name)
+    success, report = process_test_file(args.test_name, zero_phase=not args.single_pass)
 
     # Summary
     print(f"\n{'='*70}")
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Shared RBDtector result-workbook helpers for the extract scripts.
+
+extract_complete_rswa_data.py and extract_rbd_indicators.py pull different
+fields out of RBDtector's result workbooks, but find, read and save them the
+same way. That common work lives here:
+
+  - find_result_files: '<prefix>*.xlsx' entries of a directory from one scandir
+  - read_sheet_rows: the first rows of a sheet, streamed in read-only mode
+  - write_records_csv: a list of dicts as CSV through the csv module
+"""
+
+import csv
+import os
+from openpyxl import load_workbook
+
+def find_result_files(directory, prefix='RBDtector_results'):
+    """
+    Return os.DirEntry objects for '<prefix>*.xlsx' files directly inside
+    directory (empty if it does not exist). One scandir per directory; each
+    entry caches its stat(), so picking the newest file costs no extra syscalls.
+    """
+    try:
+        with os.scandir(directory) as it:
+            return [entry for entry in it
+                    if entry.name.startswith(prefix) and entry.name.endswith('.xlsx')
+                    and entry.is_file()]
+    except OSError:
+        return []
+
+def read_sheet_rows(excel_file, n_rows, sheet_name=None):
+    """
+    Read the first n_rows rows of a sheet (default: the first sheet) as tuples
+    of cell values, streaming in read-only mode instead of parsing the whole
+    sheet into a DataFrame. Empty cells are None.
+    """
+    wb = load_workbook(excel_file, read_only=True, data_only=True, keep_links=False)
+    try:
+        ws = wb[sheet_name] if sheet_name is not None else wb.worksheets[0]
+        return list(ws.iter_rows(max_row=n_rows, values_only=True))
+    finally:
+        wb.close()
+
+def write_records_csv(output_file, records, encoding='utf-8'):
+    """
+    Write a list of dicts (columns from the first record's keys) as CSV with
+    the csv module. None and NaN are written as empty fields, as to_csv did.
+    """
+    fieldnames = list(records[0]) if records else []
+    with open(output_file, 'w', encoding=encoding, newline='') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(fieldnames)
+        writer.writerows(['' if value is None or value != value else value
+                          for value in (record[name] for name in fieldnames)]
+                         for record in records)